@@ -0,0 +1,86 @@
+import asyncio
+from typing import Optional
+
+from application.storage import AbstractStorage
+from .auth import hash_password
+from .dto import OrderHistoryRow, ProductRow, UserRow
+from .models import Ticket, Product, User, Orders, OrderHistory
+
+
+class AsyncShopService:
+    """
+    Асинхронный аналог `ShopService`. Методы не читают `input()` и ничего не печатают: они принимают аргументы и
+    возвращают результат, поэтому один процесс может обслуживать множество покупателей в одном цикле событий.
+
+    Перед использованием нужно инициализировать `async_session.init_engine(...)`.
+    """
+
+    def __init__(self, storage: AbstractStorage):
+        self._storage = storage
+        self._user: Optional[UserRow] = None
+
+    @staticmethod
+    async def display_products() -> list[ProductRow]:
+        """
+        Функция возвращает список всех продуктов.
+        """
+        return await Product.afind_rows(limit=None)
+
+    async def register(self, username: str, password: str) -> Optional[User]:
+        """
+        Функция регистрирует нового пользователя с 0 points и входит под ним в систему.
+        Возвращает `None`, если username уже занят или пароль короче 8 символов.
+        """
+        if len(password) < 8 or await User.aget(username=username) is not None:
+            return None
+
+        # Хэширование пароля занимает процессор, поэтому выполняется вне цикла событий.
+        password_hash = await asyncio.to_thread(hash_password, password)
+        user = await User.acreate(username=username, password=password_hash, points=0)
+        self._login_user(user)
+        return user
+
+    async def login(self, username: str, password: str) -> Optional[User]:
+        """
+        Функция выполняет вход пользователя. Возвращает `None`, если username или пароль неверны.
+        """
+        user = await User.aget(username=username)
+        # Как и при синхронном входе, пароль, сохраненный открытым текстом, заменяется хэшем.
+        if user is None or not await user.acheck_password(password):
+            return None
+        self._login_user(user)
+        return user
+
+    def _login_user(self, user) -> None:
+        self._user = UserRow(user.id, user.username, user.points)
+        self._storage.set(name="user", item=self._user)
+
+    async def submit_ticket(self, ticket_uuid: str) -> bool:
+        """
+        Функция применяет ticket и начисляет пользователю `Ticket.POINTS` points.
+        Возвращает `False`, если ticket неверный.
+        """
+        points = await Ticket.aredeem(ticket_uuid, user_id=self._user.id)
+        if points is None:
+            return False
+
+        self._user = self._user._replace(points=points)
+        self._storage.set(name="user", item=self._user)
+        return True
+
+    async def buy_product(self, product_id: int) -> str:
+        """
+        Функция покупает одну единицу товара (см. `Orders.purchase`) и возвращает его название.
+
+        :raises PurchaseError: Если покупку невозможно провести.
+        """
+        product_name, points = await Orders.apurchase(user_id=self._user.id, product_id=product_id)
+        self._user = self._user._replace(points=points)
+        self._storage.set(name="user", item=self._user)
+        return product_name
+
+    async def profile(self) -> list[OrderHistoryRow]:
+        """
+        Функция возвращает историю заказов текущего пользователя (см. `OrderHistory`).
+        """
+        return await OrderHistory.afor_user(self._user.id)
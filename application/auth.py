@@ -0,0 +1,100 @@
+import hashlib
+import hmac
+import secrets
+import time
+from typing import Optional
+
+from application.storage import AbstractStorage
+
+# Параметры scrypt: около 16 МБ памяти и десятков миллисекунд на одну проверку пароля.
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+def hash_password(password: str) -> str:
+    """
+    Эта функция возвращает строку вида `scrypt$n$r$p$<соль>$<хэш>` для хранения в `User.password`.
+    """
+    salt = secrets.token_bytes(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password: str, stored: Optional[str]) -> bool:
+    """
+    Эта функция проверяет пароль по строке из `hash_password`. Пароли, сохраненные до перехода на хэширование
+    открытым текстом, сравниваются напрямую (см. `needs_rehash`).
+    """
+    if stored is None:
+        return False
+    if needs_rehash(stored):
+        return hmac.compare_digest(password.encode(), stored.encode())
+
+    _, n, r, p, salt, digest = stored.split("$")
+    candidate = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt), n=int(n), r=int(r), p=int(p))
+    return hmac.compare_digest(candidate.hex(), digest)
+
+
+def needs_rehash(stored: str) -> bool:
+    """
+    Эта функция возвращает `True`, если пароль хранится открытым текстом и его нужно захэшировать.
+    """
+    return not stored.startswith("scrypt$")
+
+
+class TokenCache:
+    """
+    Класс TokenCache хранит в хранилище выданные токены сессий вместе с данными пользователя, поэтому повторная
+    аутентификация по токену не требует ни проверки пароля, ни запроса к базе данных.
+
+    Токен действителен `ttl` секунд. Ограничение количества токенов и вытеснение просроченных токенов, которые
+    больше не запрашиваются, обеспечивает само хранилище, например `LRUStorage(max_size=..., ttl=...)`.
+
+    `user_fields` — какие поля пользователя хранятся вместе с токеном. Хранилищам с записями фиксированного
+    размера (`SharedMemoryStorage`) достаточно `("id",)`: размер записи тогда не зависит от длины username.
+    """
+
+    def __init__(
+        self,
+        storage: AbstractStorage,
+        ttl: float = 7 * 24 * 3600,
+        user_fields: tuple[str, ...] = ("id", "username", "points"),
+    ):
+        self._storage = storage
+        self._ttl = ttl
+        self._user_fields = user_fields
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return f"token:{token}"
+
+    def issue(self, user) -> str:
+        token = secrets.token_urlsafe(32)
+        self.update(token, user)
+        return token
+
+    def update(self, token: str, user) -> None:
+        self._storage.set(
+            name=self._key(token),
+            item={
+                "user": {field: getattr(user, field) for field in self._user_fields},
+                "expires": time.time() + self._ttl,
+            },
+        )
+
+    def get(self, token: str) -> Optional[dict]:
+        """
+        Метод возвращает данные пользователя (поля `user_fields`) или `None`, если токен неизвестен или просрочен.
+        """
+        entry = self._storage.get(self._key(token))
+        if entry is None:
+            return None
+        if entry["expires"] < time.time():
+            self._storage.delete(self._key(token))
+            return None
+        return entry["user"]
+
+    def revoke(self, token: str) -> None:
+        if self._storage.get(self._key(token)) is not None:
+            self._storage.delete(self._key(token))
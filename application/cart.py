@@ -0,0 +1,65 @@
+from application.storage import AbstractStorage
+from .models import Orders
+
+
+class Cart:
+    """
+    Класс Cart хранит корзины пользователей в хранилище под ключом `cart:<id пользователя>`.
+
+    Корзина — это словарь «идентификатор товара -> количество». Ключи словаря хранятся строками, поэтому корзину
+    можно сохранить в любом хранилище, в том числе в `FileStorage` (JSON). Оформление заказа выполняется одной
+    транзакцией `Orders.checkout`, после успешной покупки корзина очищается.
+    """
+
+    def __init__(self, storage: AbstractStorage):
+        self._storage = storage
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"cart:{user_id}"
+
+    def items(self, user_id: int) -> dict[int, int]:
+        """
+        Метод возвращает содержимое корзины пользователя.
+        """
+        return {int(product_id): count for product_id, count in (self._storage.get(self._key(user_id)) or {}).items()}
+
+    def _save(self, user_id: int, items: dict[int, int]) -> None:
+        if items:
+            self._storage.set(
+                name=self._key(user_id),
+                item={str(product_id): count for product_id, count in items.items()},
+            )
+        else:
+            self.clear(user_id)
+
+    def add(self, user_id: int, product_id: int, count: int = 1) -> None:
+        """
+        Метод добавляет `count` единиц товара в корзину пользователя.
+        """
+        items = self.items(user_id)
+        items[product_id] = items.get(product_id, 0) + count
+        self._save(user_id, items)
+
+    def remove(self, user_id: int, product_id: int) -> None:
+        """
+        Метод удаляет товар из корзины пользователя.
+        """
+        items = self.items(user_id)
+        items.pop(product_id, None)
+        self._save(user_id, items)
+
+    def clear(self, user_id: int) -> None:
+        if self._storage.get(self._key(user_id)) is not None:
+            self._storage.delete(self._key(user_id))
+
+    def checkout(self, user_id: int) -> tuple[list[tuple[str, int]], int]:
+        """
+        Метод оформляет заказ на все товары корзины (см. `Orders.checkout`) и очищает корзину.
+
+        :return: Список пар (название товара, количество) и оставшиеся points пользователя.
+        :raises PurchaseError: Если заказ невозможно оформить; корзина при этом не меняется.
+        """
+        result = Orders.checkout(user_id=user_id, items=self.items(user_id))
+        self.clear(user_id)
+        return result
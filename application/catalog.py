@@ -0,0 +1,71 @@
+from typing import Optional
+
+from application.storage import AbstractStorage, LRUStorage
+from .db import session
+from .dto import ProductRow
+from .models import Product
+
+
+class CatalogCache:
+    """
+    Класс CatalogCache кэширует каталог товаров в хранилище (по умолчанию `LRUStorage` с TTL).
+
+    В кэше хранятся легкие объекты `ProductRow`, а не экземпляры модели, поэтому записи занимают меньше памяти и
+    не связаны с сеансом SQLAlchemy.
+
+    Ключи содержат версию каталога `Product.catalog_version()`, поэтому после любого изменения товаров
+    (`Product.create`, `Product.update`, покупка) старые записи становятся недоступны и со временем вытесняются.
+    Версия читается из хранилища каталога (`Product.use_catalog_storage`), поэтому при общем хранилище изменение в
+    одном процессе инвалидирует кэши всех процессов, хотя сами записи кэша остаются в памяти процесса.
+    Промахи загружаются от имени читателя `Product.CATALOG_READER`, поэтому сразу после изменения каталога они
+    читают основную базу данных, а не отстающую реплику. После покупки это продолжается, только пока на реплике нет
+    строки нового заказа, поэтому при частых покупках каталог по-прежнему читается с догнавших реплик.
+    """
+
+    def __init__(self, storage: Optional[AbstractStorage] = None):
+        self._storage = storage if storage is not None else LRUStorage(max_size=1024, ttl=60)
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key: str, loader):
+        item = self._storage.get(key)
+        if item is not None:
+            self.hits += 1
+            return item
+
+        self.misses += 1
+        with session.reader(Product.CATALOG_READER):
+            item = loader()
+        if item is not None:
+            self._storage.set(name=key, item=item)
+        return item
+
+    def page(self, after_id: int = 0, limit: int = 50) -> list[ProductRow]:
+        """
+        Функция возвращает страницу каталога (см. `BaseModel.find_rows`), обращаясь к базе данных только при
+        промахе кэша.
+        """
+        return self._cached(
+            f"catalog:{Product.catalog_version()}:{after_id}:{limit}",
+            lambda: Product.find_rows(after_id=after_id, limit=limit),
+        )
+
+    def product(self, product_id: int) -> Optional[ProductRow]:
+        """
+        Функция возвращает товар по идентификатору или `None`, если его не существует.
+        """
+        return self._cached(
+            f"product:{Product.catalog_version()}:{product_id}",
+            lambda: Product.get_row(id=product_id),
+        )
+
+    def search(self, after_id: int = 0, limit: int = 50, **filters) -> list[ProductRow]:
+        """
+        Функция возвращает страницу результатов поиска (см. `Product.search`), обращаясь к базе данных только
+        при промахе кэша.
+        """
+        key = ":".join(f"{name}={value}" for name, value in sorted(filters.items()))
+        return self._cached(
+            f"search:{Product.catalog_version()}:{key}:{after_id}:{limit}",
+            lambda: Product.search(after_id=after_id, limit=limit, rows=True, **filters),
+        )
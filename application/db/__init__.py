@@ -1 +1 @@
-from .base import BaseModel, session
+from .base import BaseModel, session, async_session
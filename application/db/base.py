@@ -1,5 +1,58 @@
-from sqlalchemy import create_engine, select, exc, update as sqlalchemy_update
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import hashlib
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from itertools import count
+from typing import Hashable, Optional, Sequence
+
+from sqlalchemy import String, cast, create_engine, func, make_url, select, exc, update as sqlalchemy_update
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session, selectinload
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from ..metrics import metrics
+from ..storage import AbstractStorage, LRUStorage
+
+
+# Сеанс, открытый через `SessionManager.scope()` в текущем потоке/контексте.
+_scoped_session: ContextVar[Optional[Session]] = ContextVar("scoped_session", default=None)
+
+# Кто читает данные в текущем контексте (обычно идентификатор пользователя), см. `SessionManager.reader()`.
+_reader: ContextVar[Optional[Hashable]] = ContextVar("reader", default=None)
+
+
+def _is_missing_table(error: BaseException) -> bool:
+    """
+    Эта функция проверяет, вызвана ли ошибка запроса отсутствующей таблицей: PostgreSQL сообщает SQLSTATE 42P01
+    (`undefined_table`), SQLite — текст «no such table».
+    """
+    if not isinstance(error, exc.DBAPIError):
+        return False
+    return getattr(error.orig, "pgcode", None) == "42P01" or "no such table" in str(error.orig)
+
+
+def _engine_options(
+    dsn: str,
+    pool_size: Optional[int],
+    max_overflow: Optional[int],
+    pool_pre_ping: bool,
+    pool_recycle: int,
+    statement_timeout: Optional[int],
+) -> dict:
+    """
+    Эта функция собирает аргументы `create_engine` для настройки пула соединений (см. `SessionManager.init_engine`).
+    """
+    engine_kwargs = {"pool_pre_ping": pool_pre_ping, "pool_recycle": pool_recycle}
+    # Пулы SQLite не поддерживают размер и переполнение, поэтому передаем их только если они заданы явно.
+    if pool_size is not None:
+        engine_kwargs["pool_size"] = pool_size
+    if max_overflow is not None:
+        engine_kwargs["max_overflow"] = max_overflow
+    if statement_timeout is not None and make_url(dsn).get_backend_name() == "postgresql":
+        if make_url(dsn).get_driver_name() == "asyncpg":
+            engine_kwargs["connect_args"] = {"server_settings": {"statement_timeout": str(statement_timeout)}}
+        else:
+            engine_kwargs["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return engine_kwargs
 
 
 class SessionManager:
@@ -11,22 +64,72 @@ class SessionManager:
             print(" __init__ method called..")
             self._engine = None
             self._session = None
+            self._replicas = []
+            self._replica_counter = count()
+            self._read_your_writes = 0.0
+            self._pins: Optional[AbstractStorage] = None
+            # Таблицы не проверялись при запуске, потому что совпал отпечаток схемы (см. `create_tables`).
+            self._schema_trusted = False
         else:
             print("Instance already created:", self.get_instance())
 
-    def init_engine(self, dsn: str):
+    def init_engine(
+        self,
+        dsn: str,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+        pool_pre_ping: bool = False,
+        pool_recycle: int = -1,
+        statement_timeout: Optional[int] = None,
+        replicas: Sequence[str] = (),
+        read_your_writes: float = 5.0,
+        pins: Optional[AbstractStorage] = None,
+    ):
         """
         Эта функция инициализирует механизм базы данных и сеанс, используя заданный DSN.
 
+        Если указаны реплики, запросы только на чтение (`BaseModel.get`, `filter`, `all`, `find`, `find_rows` и др.)
+        распределяются между ними по кругу (см. `read`), а запись и транзакции выполняются на основной базе данных.
+        Для локальной проверки репликами могут служить копии файла SQLite.
+
         :param dsn: dsn означает «Имя источника данных» и представляет собой строку, содержащую информацию,
          необходимую для подключения к базе данных. Обычно он включает тип базы данных, хост, порт, имя базы данных
          и учетные данные для аутентификации
+        :param pool_size: Количество постоянно открытых соединений в пуле. `None` — значение по умолчанию SQLAlchemy.
+        :param max_overflow: Сколько соединений можно открыть сверх `pool_size` при пиковой нагрузке.
+        :param pool_pre_ping: Проверять соединение перед выдачей из пула, чтобы не получить разорванное соединение.
+        :param pool_recycle: Через сколько секунд пересоздавать соединение (-1 — никогда).
+        :param statement_timeout: Ограничение времени выполнения одного запроса в миллисекундах (только PostgreSQL).
+        :param replicas: DSN реплик только для чтения с теми же настройками пула.
+        :param read_your_writes: Сколько секунд после записи пользователя (см. `pin_primary`) его чтения выполняются
+         на основной базе данных, чтобы он увидел собственные изменения несмотря на отставание реплик.
+        :param pins: Хранилище отметок `pin_primary` с TTL не меньше `read_your_writes`. По умолчанию отметки хранятся
+         в памяти процесса; если запросы одного пользователя обслуживают несколько процессов, им нужно общее
+         хранилище, например `SharedMemoryStorage`.
         """
-        self._engine = create_engine(dsn)
+        self._engine = create_engine(
+            dsn, **_engine_options(dsn, pool_size, max_overflow, pool_pre_ping, pool_recycle, statement_timeout)
+        )
         self._session = sessionmaker(
             bind=self._engine,
             expire_on_commit=False,
         )
+        metrics.instrument_engine(self._engine)
+
+        self._replicas = []
+        for replica_dsn in replicas:
+            engine = create_engine(
+                replica_dsn,
+                **_engine_options(replica_dsn, pool_size, max_overflow, pool_pre_ping, pool_recycle, statement_timeout),
+            )
+            metrics.instrument_engine(engine)
+            self._replicas.append(sessionmaker(bind=engine, expire_on_commit=False))
+        self._read_your_writes = read_your_writes
+        self._pins = pins if pins is not None else LRUStorage(max_size=10000, ttl=read_your_writes)
+
+    @property
+    def engine(self):
+        return self._engine
 
     @classmethod
     def get_instance(cls):
@@ -35,28 +138,274 @@ class SessionManager:
         return cls.__instance
 
     def __call__(self, *args, **kwargs):
+        scoped = _scoped_session.get()
+        if scoped is not None:
+            # Внутри `scope()` все вызовы используют общий сеанс, а закрывает его сам `scope()`.
+            return nullcontext(scoped)
         return self._session(*args, **kwargs)
 
+    def read(self):
+        """
+        Эта функция открывает сеанс только для чтения: `with session.read() as conn: ...`.
+
+        Сеанс открывается на следующей по кругу реплике. Основная база данных используется, если реплик нет, если
+        вызов выполняется внутри `scope()` (общий сеанс), или если текущий читатель (`reader()`) недавно записывал
+        данные (`pin_primary()`), а реплика еще не получила эту запись.
+        """
+        scoped = _scoped_session.get()
+        if scoped is not None:
+            return nullcontext(scoped)
+        if not self._replicas:
+            return self._session()
+
+        replica = self._replicas[next(self._replica_counter) % len(self._replicas)]
+        pin = self._pin(_reader.get())
+        if pin is None:
+            return replica()
+        _, marker = pin
+        if marker is not None:
+            # Реплика, на которой уже есть строка записи, получила и все, что было зафиксировано до нее. Проверка
+            # выполняется в том же сеансе, поэтому и дальнейшие чтения увидят эту запись.
+            conn = replica()
+            if self._has_row(conn, marker):
+                return conn
+            conn.close()
+        return self._session()
+
+    @contextmanager
+    def reader(self, key: Optional[Hashable]):
+        """
+        Эта функция задает читателя (обычно идентификатор пользователя) для запросов внутри блока
+        `with session.reader(user_id): ...`, см. `pin_primary`.
+        """
+        token = _reader.set(key)
+        try:
+            yield
+        finally:
+            _reader.reset(token)
+
+    def pin_primary(self, key: Hashable, marker: Optional[tuple[str, int]] = None) -> None:
+        """
+        Эта функция направляет чтения читателя `key` на основную базу данных в течение `read_your_writes` секунд.
+        Ее нужно вызывать после записи, результат которой пользователь должен сразу увидеть (например, покупки).
+
+        :param marker: Имя таблицы и идентификатор строки, добавленной этой записью (например, заказа). Реплика, на
+         которой эта строка уже есть, получила запись, поэтому чтения уходят на основную базу данных, только пока
+         реплика отстает. Без `marker` основная база данных читается все `read_your_writes` секунд.
+        """
+        if not self._replicas:
+            return
+        # Отметка хранит время на часах системы, поэтому ее могут проверять и другие процессы.
+        self._pins.set(name=f"pin:{key}", item=(time.time() + self._read_your_writes, marker))
+
+    def _pin(self, key: Optional[Hashable]) -> Optional[tuple[float, Optional[tuple[str, int]]]]:
+        if key is None:
+            return None
+        pin = self._pins.get(f"pin:{key}")
+        if pin is None or pin[0] <= time.time():
+            return None
+        return pin
+
+    @staticmethod
+    def _has_row(conn: Session, marker: tuple[str, int]) -> bool:
+        table_name, row_id = marker
+        table = BaseModel.metadata.tables[table_name]
+        return conn.execute(select(table.c.id).where(table.c.id == row_id)).first() is not None
+
+    def begin(self):
+        """
+        Эта функция открывает транзакцию: `with session.begin() as conn: ...` фиксирует изменения при успешном выходе
+        из блока и откатывает их при исключении. Внутри `scope()` транзакция выполняется в общем сеансе.
+        """
+        scoped = _scoped_session.get()
+        if scoped is not None:
+            return self._scoped_transaction(scoped)
+        return self._session.begin()
+
+    @staticmethod
+    @contextmanager
+    def _scoped_transaction(conn: Session):
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    @contextmanager
+    def scope(self):
+        """
+        Эта функция открывает один сеанс и одно соединение на весь блок `with session.scope(): ...`.
+
+        Все методы `BaseModel`, вызванные внутри блока, используют этот сеанс вместо того, чтобы брать новое
+        соединение из пула на каждый запрос. Вложенные вызовы `scope()` используют уже открытый сеанс.
+        """
+        if _scoped_session.get() is not None:
+            yield _scoped_session.get()
+            return
+
+        with self._engine.connect() as connection, self._session(bind=connection) as conn:
+            token = _scoped_session.set(conn)
+            try:
+                yield conn
+            finally:
+                _scoped_session.reset(token)
+
     def __getattr__(self, item):
         return getattr(self._session, item)
 
-    def create_tables(self):
+    def create_tables(self, storage: Optional[AbstractStorage] = None, force: bool = False):
         """
         Метод создает таблицы в базе данных.
+
+        :param storage: Если указано, в нем сохраняется отпечаток схемы (хэш DDL всех моделей). При следующем запуске
+         с тем же отпечатком таблицы не проверяются и соединение с базой данных не открывается до первого запроса.
+         Если базу данных пересоздали без участия программы, первый запрос завершится ошибкой об отсутствующей
+         таблице, после которой таблицы создает `recover_missing_tables`.
+        :param force: Проверить и создать таблицы независимо от сохраненного отпечатка.
+        """
+        self._schema_trusted = False
+        if storage is None:
+            self._create_all()
+            return
+
+        key = f"schema:{self._engine.url.render_as_string(hide_password=True)}"
+        fingerprint = self.schema_fingerprint()
+        if not force and storage.get(key) == fingerprint:
+            self._schema_trusted = True
+            return
+        self._create_all()
+        storage.set(name=key, item=fingerprint)
+
+    def recover_missing_tables(self, error: BaseException) -> bool:
+        """
+        Метод создает таблицы, если `error` — ошибка об отсутствующей таблице, а таблицы при запуске не проверялись
+        (см. `create_tables`). Его нужно вызывать после того, как сеанс, в котором произошла ошибка, закрыт.
+
+        :return: `True`, если таблицы созданы и операцию можно повторить.
+        """
+        if not self._schema_trusted or not _is_missing_table(error):
+            return False
+        self._schema_trusted = False
+        self._create_all()
+        return True
+
+    def _create_all(self) -> None:
+        """
+        Метод создает недостающие таблицы, а затем недостающие индексы уже существующих таблиц: `create_all` создает
+        индексы только вместе с новой таблицей, поэтому индексы, добавленные в модели позже (например, индексы
+        поиска товаров), иначе не появились бы в развернутой базе данных. В PostgreSQL `CREATE INDEX` блокирует
+        запись в таблицу на время построения индекса.
         """
         BaseModel.metadata.create_all(bind=self._engine)
+        with self._engine.begin() as conn:
+            for table in BaseModel.metadata.sorted_tables:
+                for index in sorted(table.indexes, key=lambda i: i.name):
+                    index.create(bind=conn, checkfirst=True)
+
+    def schema_fingerprint(self) -> str:
+        """
+        Метод возвращает хэш DDL всех таблиц и индексов моделей для диалекта текущей базы данных.
+        """
+        digest = hashlib.sha256()
+        for table in BaseModel.metadata.sorted_tables:
+            digest.update(str(CreateTable(table).compile(dialect=self._engine.dialect)).encode())
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                digest.update(str(CreateIndex(index).compile(dialect=self._engine.dialect)).encode())
+        return digest.hexdigest()
 
 
 session = SessionManager()
 
 
+class AsyncSessionManager:
+    """
+    Асинхронный аналог `SessionManager` на основе `AsyncEngine` SQLAlchemy.
+
+    Используется асинхронными методами `BaseModel` (`aget`, `acreate`, `aupdate`, `afilter`, `aall`), поэтому один
+    процесс может обслуживать множество покупателей одновременно. Требует асинхронного драйвера в DSN, например
+    `postgresql+asyncpg://...` или `sqlite+aiosqlite://...`.
+    """
+
+    def __init__(self):
+        self._engine = None
+        self._session = None
+
+    def init_engine(
+        self,
+        dsn: str,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+        pool_pre_ping: bool = False,
+        pool_recycle: int = -1,
+        statement_timeout: Optional[int] = None,
+    ):
+        """
+        Эта функция инициализирует асинхронный механизм базы данных. Параметры совпадают с
+        `SessionManager.init_engine`.
+        """
+        # Асинхронное расширение импортируется только при использовании, чтобы не замедлять запуск CLI.
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        self._engine = create_async_engine(
+            dsn, **_engine_options(dsn, pool_size, max_overflow, pool_pre_ping, pool_recycle, statement_timeout)
+        )
+        self._session = async_sessionmaker(
+            bind=self._engine,
+            expire_on_commit=False,
+        )
+        metrics.instrument_engine(self._engine.sync_engine)
+
+    def __call__(self, *args, **kwargs):
+        return self._session(*args, **kwargs)
+
+    def begin(self):
+        """
+        Эта функция открывает транзакцию: `async with async_session.begin() as conn: ...`.
+        """
+        return self._session.begin()
+
+    async def create_tables(self):
+        """
+        Метод создает таблицы в базе данных.
+        """
+        async with self._engine.begin() as conn:
+            await conn.run_sync(BaseModel.metadata.create_all)
+
+    async def dispose(self):
+        """
+        Метод закрывает все соединения пула.
+        """
+        await self._engine.dispose()
+
+
+async_session = AsyncSessionManager()
+
+
 class BaseModel(DeclarativeBase):
     """
     Приведенный выше класс предоставляет методы для создания, обновления, фильтрации и извлечения экземпляров модели
     SQLAlchemy из базы данных.
     """
 
+    # Класс легкого объекта для чтения (`NamedTuple` из `application.dto`), см. `get_row` и `find_rows`.
+    __dto__ = None
+
     @classmethod
+    def _related_options(cls, with_related: tuple[str, ...]) -> list:
+        """
+        Эта функция строит опции жадной загрузки для перечисленных связей модели.
+
+        Каждая связь подгружается одним дополнительным запросом `SELECT ... WHERE id IN (...)` на всю выборку,
+        поэтому количество запросов не зависит от количества строк.
+
+        :param with_related: Имена атрибутов-связей модели (например, `("product",)` для `Orders`).
+        :return: Список опций для `select(...).options(...)`.
+        """
+        return [selectinload(getattr(cls, name)) for name in with_related]
+
+    @classmethod
+    @metrics.timed
     def get(cls, **kwargs):
         """
         Эта функция извлекает один объект из таблицы базы данных на основе предоставленных аргументов ключевого слова.
@@ -71,7 +420,7 @@ class BaseModel(DeclarativeBase):
         query = select(cls).where(*params)
 
         try:
-            with session() as conn:
+            with session.read() as conn:
                 results = conn.execute(query)
                 (res,) = results.one()
                 return res
@@ -79,6 +428,7 @@ class BaseModel(DeclarativeBase):
             return None
 
     @classmethod
+    @metrics.timed
     def create(cls, **kwargs):
         """
         Эта функция создает новый объект данного класса с предоставленными аргументами ключевого слова и сохраняет его в
@@ -94,6 +444,7 @@ class BaseModel(DeclarativeBase):
             conn.commit()
         return obj
 
+    @metrics.timed
     def update(self, **kwargs) -> None:
         """
         Эта функция обновляет атрибуты объекта в базе данных с помощью SQLAlchemy.
@@ -107,27 +458,30 @@ class BaseModel(DeclarativeBase):
             conn.commit()
 
     @classmethod
-    def filter(cls, **kwargs):
+    @metrics.timed
+    def filter(cls, *, with_related: tuple[str, ...] = (), **kwargs):
         """
         Эта функция фильтрует модель SQLAlchemy на основе заданных аргументов ключевого слова и
         возвращает соответствующие результаты.
 
         :param cls: Параметр cls является ссылкой на класс. Он используется для создания запроса SQLAlchemy
          для фильтрации экземпляров этого класса на основе предоставленных аргументов ключевого слова.
+        :param with_related: Имена связей, которые нужно загрузить вместе с результатами (см. `_related_options`).
         :return: Метод filter возвращает список объектов, соответствующих критериям фильтрации,
          указанным в словаре kwargs. Если объекты не найдены, возвращается пустой список.
         """
         params = [getattr(cls, key) == val for key, val in kwargs.items()]
-        query = select(cls).where(*params)
+        query = select(cls).where(*params).options(*cls._related_options(with_related))
         try:
-            with session() as conn:
+            with session.read() as conn:
                 results = conn.execute(query)
                 return results.scalars().all()
         except exc.NoResultFound:
             return []
 
     @classmethod
-    def all(cls):
+    @metrics.timed
+    def all(cls, *, with_related: tuple[str, ...] = ()):
         """
         Эта функция возвращает все экземпляры класса SQLAlchemy из базы данных.
 
@@ -138,8 +492,185 @@ class BaseModel(DeclarativeBase):
         скалярного значения, а метод `all()` преобразует этот генератор в список скалярных значений.
 
         :param cls: ссылка на объект класса. Класс модели SQLAlchemy представляет таблицу базы данных.
+        :param with_related: Имена связей, которые нужно загрузить вместе с результатами (см. `_related_options`).
         :return: Метод all() возвращает список всех экземпляров класса cls, существующих в базе данных.
         """
-        with session() as conn:
-            results = conn.execute(select(cls))
+        with session.read() as conn:
+            results = conn.execute(select(cls).options(*cls._related_options(with_related)))
+            return results.scalars().all()
+
+    @classmethod
+    def page(cls, after_id: int = 0, limit: int = 50, **kwargs):
+        """
+        Эта функция возвращает одну страницу объектов с помощью keyset-пагинации: объекты с `id > after_id`,
+        упорядоченные по `id`. В отличие от `OFFSET`, стоимость запроса не растет с номером страницы.
+
+        :param after_id: Идентификатор последнего объекта предыдущей страницы (0 для первой страницы).
+        :param limit: Максимальное количество объектов на странице.
+        :return: Список объектов; если он короче `limit`, то это последняя страница.
+        """
+        # Время учитывается в метрике `find`, поэтому сам метод не замеряется, чтобы не считать вызов дважды.
+        return cls.find(after_id=after_id, limit=limit, **kwargs)
+
+    @classmethod
+    @metrics.timed
+    def find(cls, *conditions, after_id: int = 0, limit: Optional[int] = 50, **kwargs):
+        """
+        Эта функция возвращает страницу объектов, удовлетворяющих произвольным условиям SQLAlchemy (например,
+        `Product.cost <= 100`) и равенствам из `kwargs`. Как и в `page`, объекты упорядочены по `id`.
+
+        :param conditions: Условия для `WHERE`.
+        :param after_id: Идентификатор последнего объекта предыдущей страницы (0 для первой страницы).
+        :param limit: Максимальное количество объектов или `None`, чтобы вернуть все.
+        :return: Список объектов.
+        """
+        params = [getattr(cls, key) == val for key, val in kwargs.items()]
+        query = select(cls).where(cls.id > after_id, *conditions, *params).order_by(cls.id).limit(limit)
+        with session.read() as conn:
+            return conn.execute(query).scalars().all()
+
+    @classmethod
+    def _row_query(cls, *conditions, **kwargs):
+        """
+        Эта функция строит запрос только тех колонок, которые перечислены в полях `__dto__` модели.
+        """
+        params = [getattr(cls, key) == val for key, val in kwargs.items()]
+        return select(*(getattr(cls, field) for field in cls.__dto__._fields)).where(*conditions, *params)
+
+    @classmethod
+    @metrics.timed
+    def get_row(cls, **kwargs):
+        """
+        Эта функция работает как `get`, но возвращает легкий объект `__dto__` (см. `application.dto`) вместо
+        экземпляра модели: запрашиваются только нужные колонки, а объект не попадает в сеанс.
+
+        :return: Объект `__dto__` или `None`, если подходящей строки нет.
+        """
+        with session.read() as conn:
+            row = conn.execute(cls._row_query(**kwargs)).first()
+        return cls.__dto__._make(row) if row is not None else None
+
+    @classmethod
+    def iter_rows(cls, *conditions, order_by=None, batch_size: int = 1000, **kwargs):
+        """
+        Эта функция-генератор выдает объекты `__dto__` (см. `get_row`), загружая строки пачками по `batch_size`
+        через серверный курсор, как `iter_all`. По умолчанию строки упорядочены по `id`.
+
+        :param conditions: Условия для `WHERE`.
+        :param order_by: Колонка или кортеж колонок для сортировки.
+        """
+        if order_by is None:
+            order_by = (cls.id,)
+        elif not isinstance(order_by, tuple):
+            order_by = (order_by,)
+        query = cls._row_query(*conditions, **kwargs).order_by(*order_by).execution_options(yield_per=batch_size)
+        with session.read() as conn:
+            for row in conn.execute(query):
+                yield cls.__dto__._make(row)
+
+    @classmethod
+    @metrics.timed
+    def max_lengths(cls, *columns: str, **kwargs) -> list[int]:
+        """
+        Эта функция возвращает максимальную длину текстового представления значений каждой из колонок `columns`
+        (`max(length(...))` на стороне базы данных) для строк, подходящих под равенства из `kwargs`.
+        Используется для ширины колонок при потоковом выводе таблиц (см. `application.table`).
+        """
+        params = [getattr(cls, key) == val for key, val in kwargs.items()]
+        query = select(*(func.max(func.length(cast(getattr(cls, column), String))) for column in columns))
+        with session.read() as conn:
+            return [length or 0 for length in conn.execute(query.where(*params)).one()]
+
+    @classmethod
+    @metrics.timed
+    def find_rows(cls, *conditions, after_id: int = 0, limit: Optional[int] = 50, **kwargs):
+        """
+        Эта функция работает как `find`, но возвращает список объектов `__dto__` (см. `get_row`).
+        """
+        query = cls._row_query(cls.id > after_id, *conditions, **kwargs).order_by(cls.id).limit(limit)
+        with session.read() as conn:
+            return [cls.__dto__._make(row) for row in conn.execute(query)]
+
+    @classmethod
+    def iter_all(cls, batch_size: int = 1000):
+        """
+        Эта функция-генератор выдает все объекты таблицы по одному, загружая их из базы данных пачками по
+        `batch_size` через серверный курсор, поэтому в памяти одновременно находится не больше одной пачки.
+        """
+        query = select(cls).order_by(cls.id).execution_options(yield_per=batch_size)
+        with session.read() as conn:
+            yield from conn.scalars(query)
+
+    @classmethod
+    @metrics.timed
+    async def aget(cls, **kwargs):
+        """
+        Асинхронная версия `get`.
+        """
+        params = [getattr(cls, key) == val for key, val in kwargs.items()]
+        query = select(cls).where(*params)
+
+        try:
+            async with async_session() as conn:
+                results = await conn.execute(query)
+                (res,) = results.one()
+                return res
+        except exc.NoResultFound:
+            return None
+
+    @classmethod
+    @metrics.timed
+    async def acreate(cls, **kwargs):
+        """
+        Асинхронная версия `create`.
+        """
+        obj = cls(**kwargs)
+        async with async_session() as conn:
+            conn.add(obj)
+            await conn.commit()
+        return obj
+
+    @metrics.timed
+    async def aupdate(self, **kwargs) -> None:
+        """
+        Асинхронная версия `update`.
+        """
+        async with async_session() as conn:
+            await conn.execute(
+                sqlalchemy_update(self.__class__)
+                .where(self.__class__.id == self.id)
+                .values(**kwargs)
+            )
+            await conn.commit()
+
+    @classmethod
+    @metrics.timed
+    async def afilter(cls, *, with_related: tuple[str, ...] = (), **kwargs):
+        """
+        Асинхронная версия `filter`.
+        """
+        params = [getattr(cls, key) == val for key, val in kwargs.items()]
+        query = select(cls).where(*params).options(*cls._related_options(with_related))
+        async with async_session() as conn:
+            results = await conn.execute(query)
+            return results.scalars().all()
+
+    @classmethod
+    @metrics.timed
+    async def afind_rows(cls, *conditions, after_id: int = 0, limit: Optional[int] = 50, **kwargs):
+        """
+        Асинхронная версия `find_rows`.
+        """
+        query = cls._row_query(cls.id > after_id, *conditions, **kwargs).order_by(cls.id).limit(limit)
+        async with async_session() as conn:
+            return [cls.__dto__._make(row) for row in await conn.execute(query)]
+
+    @classmethod
+    @metrics.timed
+    async def aall(cls, *, with_related: tuple[str, ...] = ()):
+        """
+        Асинхронная версия `all`.
+        """
+        async with async_session() as conn:
+            results = await conn.execute(select(cls).options(*cls._related_options(with_related)))
             return results.scalars().all()
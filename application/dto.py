@@ -0,0 +1,49 @@
+"""
+Легкие объекты для чтения данных моделей без ORM.
+
+Каждый класс — `NamedTuple` с теми же именами полей, что и колонки модели, поэтому строку результата
+`select(Model.id, Model.name, ...)` можно превратить в объект без identity map, отслеживания изменений и
+`__dict__` на каждый экземпляр (см. `BaseModel.get_row` и `BaseModel.find_rows`). Объекты неизменяемы,
+новое значение поля задается через `_replace`.
+"""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+class UserRow(NamedTuple):
+    # Пароль не входит в объект, поэтому его можно хранить в сессии и кэшах.
+    id: int
+    username: str
+    points: int
+
+
+class ProductRow(NamedTuple):
+    id: int
+    name: str
+    cost: int
+    count: int
+
+
+class OrderRow(NamedTuple):
+    id: int
+    user_id: int
+    product_id: int
+    count: int
+    order_datetime: datetime
+
+
+class TicketRow(NamedTuple):
+    id: int
+    uuid: str
+    available: bool
+    user: Optional[int]
+
+
+class OrderHistoryRow(NamedTuple):
+    id: int
+    order_id: int
+    user_id: int
+    product_name: str
+    count: int
+    cost: int
+    order_datetime: datetime
@@ -1,17 +1,23 @@
-from typing import Callable, Optional
+from typing import Callable, Collection, Optional
 
-from .models import User
+from .db import session
+from .metrics import metrics
+from .dto import UserRow
 from .storage import AbstractStorage
 
 
 class UserMenu:
-    def __init__(self, storage: AbstractStorage):
+    # Уровни доступа `login_required`: всем, только без входа, только после входа, только администраторам.
+    ANYONE, ANONYMOUS, LOGGED_IN, ADMIN = 0, 1, 2, 3
+
+    def __init__(self, storage: AbstractStorage, admin_usernames: Collection[str] = ()):
         self._menu_list = []
         self._storage = storage
+        self._admin_usernames = frozenset(admin_usernames)
 
-    def get_current_user(self) -> Optional[User]:
+    def get_current_user(self) -> Optional[UserRow]:
         """
-        Если в storage есть ключ user, то возвращается соответствующее значение (объект User).
+        Если в storage есть ключ user, то возвращается соответствующее значение (объект UserRow).
         Если ключ «user» отсутствует в storage, то возвращается «None».
         """
         return self._storage.get("user")
@@ -25,8 +31,9 @@ class UserMenu:
         :param callback: Параметр «обратный вызов» — это функция, которая будет вызываться при выборе пользователем
          категории меню. Это тип Callable, что означает, что это может быть любой объект,
          который можно вызывать как функцию. Функция не должна принимать аргументы и ничего не возвращать.
-        :param login_required: Параметр `login_required` представляет собой логическое значение, указывающее, должен ли
-         пользователь войти в систему для доступа к категории меню.
+        :param login_required: Параметр `login_required` указывает, кому доступна категория меню: 0 — всем,
+         1 — только без входа в систему, 2 — только после входа, 3 — только администраторам (пользователям из
+         `admin_usernames`).
         """
         self._menu_list.append(
             {
@@ -36,17 +43,27 @@ class UserMenu:
             }
         )
 
+    def is_available(self, category: dict, user: Optional[UserRow]) -> bool:
+        """
+        Эта функция проверяет, доступна ли категория меню пользователю `user` (`None` — вход не выполнен).
+        """
+        level = category["login_required"]
+        if level == self.ANYONE:
+            return True
+        if level == self.ANONYMOUS:
+            return user is None
+        if level == self.LOGGED_IN:
+            return user is not None
+        return user is not None and user.username in self._admin_usernames
+
     def display_categories(self):
         """
-        Эта функция отображает категории меню, пропуская те, которые требуют входа в систему, если пользователь в данный
-        момент не вошел в систему.
+        Эта функция отображает категории меню, пропуская те, которые недоступны текущему пользователю: требуют входа в
+        систему, когда пользователь не вошел, или прав администратора.
         """
+        user = self.get_current_user()
         for i, cat in enumerate(self._menu_list, 1):
-            if (cat["login_required"]) == 0:
-                print(f" {i}. {cat['name']}")
-            if self.get_current_user() and cat["login_required"] == 2:
-                print(f" {i}. {cat['name']}")
-            elif self.get_current_user() is None and cat["login_required"] == 1:
+            if self.is_available(cat, user):
                 print(f" {i}. {cat['name']}")
 
     def handler(self):
@@ -54,9 +71,10 @@ class UserMenu:
         Функция принимает пользовательский ввод, проверяет, является ли он допустимым индексом,
         и вызывает соответствующую функцию обратного вызова из списка.
 
-        Если входной индекс не является цифрой или выходит за пределы допустимого диапазона (меньше 1 или больше
-        длины списка меню), то ничего не возвращается (неявно возвращает None). В противном случае вызывается функция,
-        связанная с выбранным пунктом меню.
+        Если входной индекс не является цифрой, выходит за пределы допустимого диапазона (меньше 1 или больше
+        длины списка меню) или выбранный пункт недоступен текущему пользователю (см. `is_available`), то ничего
+        не возвращается (неявно возвращает None). В противном случае вызывается функция, связанная с выбранным
+        пунктом меню.
         """
         index = input(" > ")
         if not index.isdigit():
@@ -65,4 +83,19 @@ class UserMenu:
         if index < 1 or index > len(self._menu_list):
             return
 
-        self._menu_list[index - 1]["callback"]()
+        category = self._menu_list[index - 1]
+        user = self.get_current_user()
+        # Пункт, которого нет в списке, нельзя выбрать и по номеру.
+        if not self.is_available(category, user):
+            return
+        # Время выполнения пункта меню и все его SQL-запросы учитываются в метриках под его названием. Чтения
+        # выполняются от имени текущего пользователя, чтобы после своих покупок он читал с основной базы данных.
+        try:
+            with metrics.action(category["name"]), session.reader(user.id if user is not None else None):
+                category["callback"]()
+        except Exception as error:
+            # Таблицы не проверяются при запуске, поэтому база данных, пересозданная без участия программы,
+            # получает их после первой ошибки об отсутствующей таблице.
+            if not session.recover_missing_tables(error):
+                raise
+            print(" Таблицы базы данных созданы, повторите действие")
@@ -0,0 +1,201 @@
+import functools
+import inspect
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Пункт меню (или другая операция), который выполняется в текущем контексте. Им помечаются SQL-запросы.
+_current_action: ContextVar[str] = ContextVar("current_action", default="-")
+
+
+class Histogram:
+    """
+    Класс Histogram хранит количество и сумму наблюдений, а также последние `max_samples` значений, по которым
+    считаются перцентили.
+    """
+
+    def __init__(self, max_samples: int = 10000):
+        self.count = 0
+        self.total = 0.0
+        self._samples = deque(maxlen=max_samples)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self._samples.append(value)
+
+    def percentile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class Metrics:
+    """
+    Класс Metrics собирает гистограммы времени выполнения по именам метрик и набору меток, например
+    `("db_query_seconds", (("action", "Купить"),))`.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, slow_query_seconds: float = 0.5):
+        self._lock = Lock()
+        self._histograms: dict[tuple[str, tuple], Histogram] = {}
+        self._counters: dict[tuple[str, tuple], int] = {}
+        self.slow_query_seconds = slow_query_seconds
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: int = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def counter(self, name: str, **labels) -> int:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    @contextmanager
+    def action(self, name: str):
+        """
+        Контекстный менеджер замеряет время операции `name`, а все SQL-запросы внутри блока помечаются ее именем.
+        """
+        token = _current_action.set(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("action_seconds", time.perf_counter() - start, action=name)
+            _current_action.reset(token)
+
+    def timed(self, func):
+        """
+        Декоратор замеряет время выполнения метода модели и сохраняет его в метрике `model_method_seconds`
+        с меткой `method="<Модель>.<метод>"`.
+        """
+        def method_name(args) -> str:
+            owner = args[0] if isinstance(args[0], type) else type(args[0])
+            return f"{owner.__name__}.{func.__name__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.observe("model_method_seconds", time.perf_counter() - start, method=method_name(args))
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe("model_method_seconds", time.perf_counter() - start, method=method_name(args))
+
+        return wrapper
+
+    def instrument_engine(self, engine) -> None:
+        """
+        Метод подписывается на события движка SQLAlchemy и для каждого запроса сохраняет время выполнения
+        (`db_query_seconds`), количество запросов (`db_queries_total`) и строк (`db_rows_total`) с меткой текущей
+        операции.
+        """
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["query_start"].pop()
+            action = _current_action.get()
+            self.observe("db_query_seconds", elapsed, action=action)
+            self.inc("db_queries_total", action=action)
+            if cursor.rowcount is not None and cursor.rowcount > 0:
+                self.inc("db_rows_total", cursor.rowcount, action=action)
+            if elapsed >= self.slow_query_seconds:
+                logger.warning("Медленный запрос (%.3f c, %s): %s", elapsed, action, statement)
+
+    def dump(self) -> str:
+        """
+        Метод возвращает текстовую таблицу со всеми метриками.
+        """
+        lines = []
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                label = ",".join(f"{key}={value}" for key, value in labels)
+                percentiles = " ".join(
+                    f"p{int(q * 100)}={histogram.percentile(q) * 1000:.2f}ms" for q in self.QUANTILES
+                )
+                lines.append(f" {name}[{label}] count={histogram.count} {percentiles}")
+            for (name, labels), count in sorted(self._counters.items()):
+                label = ",".join(f"{key}={value}" for key, value in labels)
+                lines.append(f" {name}[{label}] {count}")
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """
+        Метод возвращает метрики в текстовом формате Prometheus (гистограммы — как summary).
+        """
+        def format_labels(labels: tuple, extra: Optional[tuple] = None) -> str:
+            items = list(labels) + ([extra] if extra else [])
+            if not items:
+                return ""
+            # В значениях меток экранируются обратная косая черта, кавычка и перевод строки.
+            escaped = (
+                str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in items
+            )
+            return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} summary")
+                for (metric, labels), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for q in self.QUANTILES:
+                        lines.append(f"{name}{format_labels(labels, ('quantile', q))} {histogram.percentile(q)}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {histogram.total}")
+                    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, file_name: str) -> None:
+        with open(file_name, "w") as file:
+            file.write(self.to_prometheus())
+
+
+metrics = Metrics()
@@ -1,11 +1,32 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, DateTime
+import asyncio
+import secrets
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import (
+    DDL, Column, String, Integer, ForeignKey, Boolean, Date, DateTime, Index, case, delete, event, func, insert,
+    select, update,
+)
 from sqlalchemy.orm import relationship
 
-from .db import BaseModel
+from application.storage import AbstractStorage, MemoryStorage
+from .auth import hash_password, needs_rehash, verify_password
+from .db import BaseModel, session, async_session
+from .dto import OrderHistoryRow, OrderRow, ProductRow, TicketRow, UserRow
+from .search import NameIndex
+
+
+class PurchaseError(Exception):
+    """
+    Исключение возникает, когда покупку невозможно провести. Текст исключения предназначен для пользователя.
+    """
 
 
 class Product(BaseModel):
     __tablename__ = "products"
+    __dto__ = ProductRow
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, unique=True)
@@ -13,12 +34,188 @@ class Product(BaseModel):
     count = Column(Integer)
     order = relationship("Orders", back_populates="product")
 
+    # Триграммный индекс (PostgreSQL, расширение pg_trgm) ускоряет `ILIKE '%...%'` и `ILIKE '...%'` по названию,
+    # составные индексы — фильтры по стоимости и наличию с сортировкой по `id` (см. `Product.search`).
+    __table_args__ = (
+        Index(
+            "ix_products_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_products_cost_id", "cost", "id"),
+        Index(
+            "ix_products_in_stock_cost_id",
+            "cost",
+            "id",
+            postgresql_where=count > 0,
+            sqlite_where=count > 0,
+        ),
+    )
+
+    # Версия каталога меняется при каждом изменении товаров, по ней инвалидируется `CatalogCache`. Версия хранится в
+    # хранилище, общем для всех процессов, которые меняют и читают каталог (см. `use_catalog_storage`).
+    _catalog_storage: AbstractStorage = MemoryStorage()
+
+    # Читатель (см. `SessionManager.reader`), от имени которого `CatalogCache` загружает каталог.
+    CATALOG_READER = "catalog"
+
+    # Индекс названий в памяти процесса для баз данных без триграммных индексов и время его построения.
+    # Индекс перестраивается после изменения названий (в любом процессе с общим хранилищем каталога) и не реже раза
+    # в `NAME_INDEX_TTL` секунд.
+    NAME_INDEX_TTL = 60
+    _name_index = None
+    _name_index_built = 0.0
+    # Версия названий (`catalog:names` в хранилище каталога), по которой построен индекс.
+    _name_index_version = None
+
+    # Сколько идентификаторов из индекса названий проверяется одним запросом.
+    SEARCH_CHUNK_SIZE = 500
+
     def __str__(self):
         return f"Product: <{self.name}>"
 
+    @classmethod
+    def use_catalog_storage(cls, storage: AbstractStorage) -> None:
+        """
+        Эта функция задает хранилище версии каталога. По умолчанию версия хранится в памяти процесса; если товары
+        меняют несколько процессов, им нужно общее хранилище, например `SharedMemoryStorage`, иначе покупка в одном
+        процессе не инвалидирует кэши каталога остальных.
+        """
+        Product._catalog_storage = storage
+
+    @classmethod
+    def catalog_version(cls) -> Optional[str]:
+        return Product._catalog_storage.get("catalog:version")
+
+    @classmethod
+    def invalidate_catalog(cls, names: bool = False, marker: Optional[tuple[str, int]] = None) -> None:
+        """
+        Эта функция инвалидирует кэш каталога. С `names=True` также сбрасывается индекс названий, это нужно только
+        при добавлении товаров и изменении их названий.
+
+        :param marker: Строка, добавленная вместе с изменением каталога (см. `SessionManager.pin_primary`): с ней
+         каталог новой версии загружается с любой реплики, которая уже получила изменение.
+        """
+        # Новая версия случайна, а не увеличивается на единицу, поэтому одновременные изменения в разных процессах
+        # не могут записать одну и ту же версию.
+        Product._catalog_storage.set(name="catalog:version", item=secrets.token_hex(8))
+        # Пока реплики могут отставать, каталог новой версии загружается с основной базы данных, иначе в кэш
+        # под новой версией попадут старые данные.
+        session.pin_primary(Product.CATALOG_READER, marker)
+        if names:
+            Product._catalog_storage.set(name="catalog:names", item=secrets.token_hex(8))
+
+    @classmethod
+    def create(cls, **kwargs):
+        obj = super().create(**kwargs)
+        cls.invalidate_catalog(names=True, marker=(cls.__tablename__, obj.id))
+        return obj
+
+    def update(self, **kwargs) -> None:
+        super().update(**kwargs)
+        self.invalidate_catalog(names="name" in kwargs)
+
+    @classmethod
+    async def acreate(cls, **kwargs):
+        obj = await super().acreate(**kwargs)
+        cls.invalidate_catalog(names=True)
+        return obj
+
+    async def aupdate(self, **kwargs) -> None:
+        await super().aupdate(**kwargs)
+        self.invalidate_catalog(names="name" in kwargs)
+
+    @classmethod
+    def name_index(cls) -> NameIndex:
+        """
+        Эта функция возвращает индекс названий, при необходимости строя его одним запросом `SELECT id, name`.
+        """
+        index = Product._name_index
+        names_version = Product._catalog_storage.get("catalog:names")
+        if (
+            index is None
+            or names_version != Product._name_index_version
+            or time.monotonic() - Product._name_index_built > cls.NAME_INDEX_TTL
+        ):
+            with session.read() as conn:
+                index = NameIndex(conn.execute(select(cls.id, cls.name)).all())
+            Product._name_index = index
+            Product._name_index_version = names_version
+            Product._name_index_built = time.monotonic()
+        return index
+
+    @classmethod
+    def search(
+        cls,
+        text: str = "",
+        prefix: bool = False,
+        min_cost: Optional[int] = None,
+        max_cost: Optional[int] = None,
+        in_stock: bool = False,
+        after_id: int = 0,
+        limit: int = 50,
+        rows: bool = False,
+    ) -> list:
+        """
+        Эта функция ищет товары по названию (без учета регистра) и фильтрует их по стоимости и наличию.
+
+        В PostgreSQL название проверяется `ILIKE` по триграммному индексу `ix_products_name_trgm`. В остальных базах
+        данных подходящие идентификаторы берутся из индекса названий в памяти (`name_index`) и проверяются
+        запросами `WHERE id IN (...)` пачками по `SEARCH_CHUNK_SIZE`, пока не наберется `limit` товаров.
+        Результаты упорядочены по `id` и разбиваются на страницы так же, как `BaseModel.page`.
+
+        :param text: Строка для поиска; пустая строка — без условия на название.
+        :param prefix: Искать по началу названия, а не по подстроке.
+        :param min_cost: Минимальная стоимость.
+        :param max_cost: Максимальная стоимость.
+        :param in_stock: Только товары в наличии.
+        :param after_id: Идентификатор последнего товара предыдущей страницы.
+        :param limit: Максимальное количество товаров.
+        :param rows: Вернуть легкие объекты `ProductRow` вместо экземпляров модели (см. `BaseModel.find_rows`).
+        :return: Список товаров.
+        """
+        find = cls.find_rows if rows else cls.find
+        conditions = []
+        if min_cost is not None:
+            conditions.append(cls.cost >= min_cost)
+        if max_cost is not None:
+            conditions.append(cls.cost <= max_cost)
+        if in_stock:
+            conditions.append(cls.count > 0)
+
+        if not text:
+            return find(*conditions, after_id=after_id, limit=limit)
+
+        if session.engine.dialect.name == "postgresql":
+            escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            pattern = f"{escaped}%" if prefix else f"%{escaped}%"
+            return find(cls.name.ilike(pattern, escape="\\"), *conditions, after_id=after_id, limit=limit)
+
+        index = cls.name_index()
+        ids = index.prefix(text) if prefix else index.substring(text)
+        ids = ids[bisect_right(ids, after_id):]
+        products = []
+        for start in range(0, len(ids), cls.SEARCH_CHUNK_SIZE):
+            chunk = ids[start:start + cls.SEARCH_CHUNK_SIZE]
+            products += find(cls.id.in_(chunk), *conditions, limit=limit - len(products))
+            if len(products) >= limit:
+                break
+        return products
+
+
+# Триграммному индексу нужно расширение pg_trgm, оно создается перед индексом, в том числе когда индекс добавляется
+# в уже существующую таблицу (см. `SessionManager.create_tables`).
+event.listen(
+    next(index for index in Product.__table__.indexes if index.name == "ix_products_name_trgm"),
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
 
 class Ticket(BaseModel):
     __tablename__ = "tickets"
+    __dto__ = TicketRow
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     uuid = Column(String(length=26))
@@ -26,9 +223,81 @@ class Ticket(BaseModel):
     user = Column(Integer, ForeignKey("users.id"), nullable=True)
     user_id = relationship("User", back_populates="ticket")
 
+    # Частичный индекс содержит только непогашенные тикеты, поэтому остается маленьким даже после больших акций.
+    __table_args__ = (
+        Index("ix_tickets_uuid", "uuid", unique=True),
+        Index(
+            "ix_tickets_available_uuid",
+            "uuid",
+            postgresql_where=available.is_(True),
+            sqlite_where=available.is_(True),
+        ),
+    )
+
+    # Количество points, начисляемых за один тикет.
+    POINTS = 20
+
+    @classmethod
+    def mint(cls, count: int, batch_size: int = 10000) -> Iterator[str]:
+        """
+        Эта функция-генератор выпускает `count` новых тикетов пачками по `batch_size`: каждая пачка — один
+        многострочный `INSERT` и один commit. Коды тикетов выдаются после сохранения их пачки.
+
+        :param count: Количество тикетов.
+        :param batch_size: Количество тикетов в одном запросе.
+        :return: Генератор кодов (uuid) выпущенных тикетов.
+        """
+        while count > 0:
+            codes = [secrets.token_hex(13) for _ in range(min(batch_size, count))]
+            with session.begin() as conn:
+                conn.execute(insert(cls).values([{"uuid": code, "available": True} for code in codes]))
+            count -= len(codes)
+            yield from codes
+
+    @classmethod
+    def redeem(cls, ticket_uuid: str, user_id: int) -> Optional[int]:
+        """
+        Эта функция погашает тикет и начисляет пользователю `Ticket.POINTS` points в одной транзакции.
+
+        Тикет погашается условным `UPDATE ... WHERE uuid = ? AND available RETURNING id`, поэтому один и тот же
+        тикет нельзя применить дважды даже при одновременных запросах.
+
+        :return: Новое количество points пользователя или `None`, если тикет не существует или уже погашен.
+        """
+        with session.begin() as conn:
+            points = cls._redeem(conn, ticket_uuid, user_id)
+        session.pin_primary(user_id)
+        return points
+
+    @classmethod
+    async def aredeem(cls, ticket_uuid: str, user_id: int) -> Optional[int]:
+        """
+        Асинхронная версия `redeem`.
+        """
+        async with async_session.begin() as conn:
+            return await conn.run_sync(cls._redeem, ticket_uuid, user_id)
+
+    @classmethod
+    def _redeem(cls, conn, ticket_uuid: str, user_id: int) -> Optional[int]:
+        ticket_id = conn.execute(
+            update(cls)
+            .where(cls.uuid == ticket_uuid, cls.available.is_(True), cls.user.is_(None))
+            .values(available=False, user=user_id)
+            .returning(cls.id)
+        ).scalar_one_or_none()
+        if ticket_id is None:
+            return None
+
+        return conn.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(points=User.points + cls.POINTS)
+            .returning(User.points)
+        ).scalar_one()
+
     @classmethod
     def is_valid(cls, ticket_uuid: str) -> bool:
-        ticket: Ticket = cls.get(uuid=ticket_uuid)
+        ticket = cls.get_row(uuid=ticket_uuid)
         if ticket is None:
             return False
         return ticket.available and not ticket.user
@@ -36,6 +305,7 @@ class Ticket(BaseModel):
 
 class User(BaseModel):
     __tablename__ = "users"
+    __dto__ = UserRow
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String, unique=True)
@@ -46,11 +316,65 @@ class User(BaseModel):
 
     @staticmethod
     def is_exist(username: str) -> bool:
-        return User.get(username=username) is not None
+        return User.get_row(username=username) is not None
+
+    @classmethod
+    def register(cls, username: str, password: str) -> "User":
+        """
+        Эта функция создает пользователя с 0 points. Пароль сохраняется только в виде соленого хэша.
+        """
+        return cls.create(username=username, password=hash_password(password), points=0)
+
+    def _verified_hash(self, password: str) -> Optional[str]:
+        """
+        Эта функция проверяет пароль и возвращает хэш, который должен храниться в базе данных: текущий или новый
+        вместо пароля, сохраненного открытым текстом. Если пароль неверный, возвращается `None`.
+        """
+        if not verify_password(password, self.password):
+            return None
+        return hash_password(password) if needs_rehash(self.password) else self.password
+
+    def check_password(self, password: str) -> bool:
+        """
+        Эта функция проверяет пароль пользователя. Пароль, сохраненный открытым текстом, после успешной проверки
+        заменяется хэшем.
+        """
+        password_hash = self._verified_hash(password)
+        if password_hash is None:
+            return False
+        if password_hash != self.password:
+            self.password = password_hash
+            self.update(password=password_hash)
+        return True
+
+    async def acheck_password(self, password: str) -> bool:
+        """
+        Асинхронная версия `check_password`. Хэширование занимает процессор, поэтому выполняется вне цикла событий.
+        """
+        password_hash = await asyncio.to_thread(self._verified_hash, password)
+        if password_hash is None:
+            return False
+        if password_hash != self.password:
+            self.password = password_hash
+            await self.aupdate(password=password_hash)
+        return True
+
+    @classmethod
+    def authenticate(cls, username: str, password: str) -> Optional["User"]:
+        """
+        Эта функция находит пользователя по username одним запросом и проверяет пароль.
+
+        :return: Пользователь или `None`, если username не существует или пароль неверный.
+        """
+        user = cls.get(username=username)
+        if user is None or not user.check_password(password):
+            return None
+        return user
 
 
 class Orders(BaseModel):
     __tablename__ = "orders"
+    __dto__ = OrderRow
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -59,3 +383,407 @@ class Orders(BaseModel):
     product = relationship("Product", back_populates="order")
     count = Column(Integer)
     order_datetime = Column(DateTime)
+
+    # Отчеты (`application.reports`) читают новые заказы диапазоном по времени оформления.
+    __table_args__ = (
+        Index("ix_orders_order_datetime", "order_datetime"),
+    )
+
+    @classmethod
+    def create(cls, **kwargs):
+        """
+        Эта функция создает заказ вместе с его строкой в истории заказов (см. `OrderHistory.record`) в одной
+        транзакции, поэтому заказы, созданные в обход `purchase`, тоже видны в профиле.
+        """
+        order = cls(**kwargs)
+        with session.begin() as conn:
+            conn.add(order)
+            conn.flush()
+            product = conn.get(Product, order.product_id)
+            OrderHistory.record(
+                conn,
+                [
+                    {
+                        "order_id": order.id,
+                        "user_id": order.user_id,
+                        "product_name": product.name,
+                        "count": order.count,
+                        "cost": product.cost * order.count,
+                        "order_datetime": order.order_datetime,
+                    }
+                ],
+            )
+        session.pin_primary(order.user_id, (cls.__tablename__, order.id))
+        return order
+
+    @classmethod
+    def purchase(cls, user_id: int, product_id: int) -> tuple[str, int]:
+        """
+        Эта функция атомарно проводит покупку одной единицы товара в одной транзакции.
+
+        Количество товара и points пользователя уменьшаются условными `UPDATE ... RETURNING`, поэтому два
+        конкурентных покупателя не могут купить последнюю единицу товара или увести points в минус.
+        Если одно из условий не выполнено, транзакция откатывается целиком.
+
+        :param user_id: Идентификатор покупателя.
+        :param product_id: Идентификатор товара.
+        :return: Название купленного товара и оставшиеся points пользователя.
+        :raises PurchaseError: Если товара не существует, он закончился или у пользователя недостаточно points.
+        """
+        with session.begin() as conn:
+            product_name, points, order_id = cls._purchase(conn, user_id, product_id)
+        # Реплики могут еще не получить заказ, поэтому каталог и история пользователя читаются с основной базы
+        # данных, пока на реплике нет строки заказа.
+        marker = (cls.__tablename__, order_id)
+        Product.invalidate_catalog(marker=marker)
+        session.pin_primary(user_id, marker)
+        return product_name, points
+
+    @classmethod
+    async def apurchase(cls, user_id: int, product_id: int) -> tuple[str, int]:
+        """
+        Асинхронная версия `purchase`.
+        """
+        async with async_session.begin() as conn:
+            product_name, points, order_id = await conn.run_sync(cls._purchase, user_id, product_id)
+        Product.invalidate_catalog(marker=(cls.__tablename__, order_id))
+        return product_name, points
+
+    @classmethod
+    def _purchase(cls, conn, user_id: int, product_id: int) -> tuple[str, int, int]:
+        product = conn.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.count > 0)
+            .values(count=Product.count - 1)
+            .returning(Product.name, Product.cost)
+        ).one_or_none()
+        if product is None:
+            if conn.execute(select(Product.id).where(Product.id == product_id)).first() is None:
+                raise PurchaseError("Такого продукта не существует")
+            raise PurchaseError("Товар закончился")
+
+        points = conn.execute(
+            update(User)
+            .where(User.id == user_id, User.points >= product.cost)
+            .values(points=User.points - product.cost)
+            .returning(User.points)
+        ).scalar_one_or_none()
+        if points is None:
+            raise PurchaseError("У вас недостаточно поинтов")
+
+        # Время заказа берется после всех блокировок, от него до commit остаются только вставки (см. `REFRESH_LAG`
+        # в `application.reports`).
+        order_datetime = datetime.now()
+        order_id = conn.execute(
+            insert(cls)
+            .values(
+                user_id=user_id,
+                product_id=product_id,
+                count=1,
+                order_datetime=order_datetime,
+            )
+            .returning(cls.id)
+        ).scalar_one()
+        OrderHistory.record(
+            conn,
+            [
+                {
+                    "order_id": order_id,
+                    "user_id": user_id,
+                    "product_name": product.name,
+                    "count": 1,
+                    "cost": product.cost,
+                    "order_datetime": order_datetime,
+                }
+            ],
+        )
+        return product.name, points, order_id
+
+    @classmethod
+    def checkout(cls, user_id: int, items: dict[int, int]) -> tuple[list[tuple[str, int]], int]:
+        """
+        Эта функция оформляет заказ сразу на несколько товаров в одной транзакции.
+
+        Все товары проверяются одним `SELECT ... WHERE id IN (...)` и блокируются (`FOR UPDATE`) в порядке
+        возрастания id, поэтому конкурентные покупки пересекающихся корзин не приводят к взаимной блокировке.
+        Количество товаров уменьшается одним `UPDATE`, points списываются условным `UPDATE ... RETURNING`, а все
+        заказы добавляются одним многострочным `INSERT`. Число запросов не зависит от количества товаров в корзине.
+
+        :param user_id: Идентификатор покупателя.
+        :param items: Словарь «идентификатор товара -> количество».
+        :return: Список пар (название товара, количество) и оставшиеся points пользователя.
+        :raises PurchaseError: Если товара не существует, его недостаточно или у пользователя недостаточно points.
+        """
+        with session.begin() as conn:
+            bought, points, order_id = cls._checkout(conn, user_id, items)
+        marker = (cls.__tablename__, order_id)
+        Product.invalidate_catalog(marker=marker)
+        session.pin_primary(user_id, marker)
+        return bought, points
+
+    @classmethod
+    def _checkout(cls, conn, user_id: int, items: dict[int, int]) -> tuple[list[tuple[str, int]], int, int]:
+        items = {product_id: count for product_id, count in sorted(items.items()) if count > 0}
+        if not items:
+            raise PurchaseError("Корзина пуста")
+
+        products = conn.execute(
+            select(Product.id, Product.name, Product.cost, Product.count)
+            .where(Product.id.in_(items))
+            .order_by(Product.id)
+            .with_for_update()
+        ).all()
+        if len(products) < len(items):
+            raise PurchaseError("Такого продукта не существует")
+        for product in products:
+            if product.count < items[product.id]:
+                raise PurchaseError(f"Товар закончился: {product.name}")
+
+        # Условие на количество защищает от гонки в базах данных без `FOR UPDATE` (например, SQLite).
+        quantity = case(items, value=Product.id, else_=0)
+        updated = conn.execute(
+            update(Product)
+            .where(Product.id.in_(items), Product.count >= quantity)
+            .values(count=Product.count - quantity)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if updated != len(items):
+            raise PurchaseError("Товар закончился")
+
+        total = sum(product.cost * items[product.id] for product in products)
+        points = conn.execute(
+            update(User)
+            .where(User.id == user_id, User.points >= total)
+            .values(points=User.points - total)
+            .returning(User.points)
+        ).scalar_one_or_none()
+        if points is None:
+            raise PurchaseError("У вас недостаточно поинтов")
+
+        # Время заказа берется после всех блокировок, от него до commit остаются только вставки (см. `REFRESH_LAG`
+        # в `application.reports`).
+        order_datetime = datetime.now()
+        order_ids = conn.execute(
+            insert(cls).returning(cls.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": user_id,
+                    "product_id": product.id,
+                    "count": items[product.id],
+                    "order_datetime": order_datetime,
+                }
+                for product in products
+            ],
+        ).scalars().all()
+        OrderHistory.record(
+            conn,
+            [
+                {
+                    "order_id": order_id,
+                    "user_id": user_id,
+                    "product_name": product.name,
+                    "count": items[product.id],
+                    "cost": product.cost * items[product.id],
+                    "order_datetime": order_datetime,
+                }
+                for order_id, product in zip(order_ids, products)
+            ],
+        )
+        return [(product.name, items[product.id]) for product in products], points, max(order_ids)
+
+
+class OrderHistory(BaseModel):
+    """
+    Денормализованная история заказов для страницы профиля: название товара и стоимость хранятся в самой строке,
+    поэтому история пользователя читается одним диапазонным сканированием индекса `(user_id, order_datetime)`.
+    Строки добавляются в той же транзакции, что и заказ (см. `Orders.purchase`, `Orders.create`). Для заказов,
+    которые уже были в базе данных, история строится при создании таблиц (см. `_backfill_order_history`), а после
+    загрузки заказов в обход моделей ее нужно перестроить: `python -m application.reports --rebuild-history`.
+    """
+
+    __tablename__ = "order_history"
+    __dto__ = OrderHistoryRow
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    product_name = Column(String)
+    count = Column(Integer)
+    cost = Column(Integer)
+    order_datetime = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_order_history_user_datetime", "user_id", "order_datetime"),
+    )
+
+    @classmethod
+    def record(cls, conn, rows: list[dict]) -> None:
+        """
+        Эта функция добавляет строки истории и обновляет итоги пользователей в `UserOrderStats` в текущей транзакции.
+
+        :param conn: Сеанс открытой транзакции.
+        :param rows: Словари с ключами `order_id`, `user_id`, `product_name`, `count`, `cost` (сумма по строке)
+         и `order_datetime`.
+        """
+        conn.execute(insert(cls).values(rows))
+
+        totals: dict[int, dict] = {}
+        for row in rows:
+            total = totals.setdefault(row["user_id"], {"orders": 0, "spent": 0, "last": row["order_datetime"]})
+            total["orders"] += 1
+            total["spent"] += row["cost"]
+            total["last"] = max(total["last"], row["order_datetime"])
+        for user_id, total in totals.items():
+            UserOrderStats.add(conn, user_id, total["orders"], total["spent"], total["last"])
+
+    @classmethod
+    def for_user(cls, user_id: int) -> list[OrderHistoryRow]:
+        """
+        Эта функция возвращает историю заказов пользователя в порядке оформления в виде легких объектов
+        `OrderHistoryRow`.
+        """
+        query = cls._row_query(user_id=user_id).order_by(cls.order_datetime, cls.id)
+        with session.read() as conn:
+            return [OrderHistoryRow._make(row) for row in conn.execute(query)]
+
+    @classmethod
+    async def afor_user(cls, user_id: int) -> list[OrderHistoryRow]:
+        """
+        Асинхронная версия `for_user`.
+        """
+        query = cls._row_query(user_id=user_id).order_by(cls.order_datetime, cls.id)
+        async with async_session() as conn:
+            return [OrderHistoryRow._make(row) for row in await conn.execute(query)]
+
+    @classmethod
+    def rebuild(cls) -> None:
+        """
+        Эта функция заново строит историю и итоги по таблице `orders`, например после загрузки заказов в обход
+        `Orders.purchase` или при первом развертывании.
+        """
+        with session.begin() as conn:
+            cls._rebuild(conn)
+
+    @classmethod
+    def _rebuild(cls, conn) -> None:
+        conn.execute(delete(UserOrderStats))
+        conn.execute(delete(cls))
+        conn.execute(
+            insert(cls).from_select(
+                ["order_id", "user_id", "product_name", "count", "cost", "order_datetime"],
+                select(
+                    Orders.id,
+                    Orders.user_id,
+                    Product.name,
+                    Orders.count,
+                    Orders.count * Product.cost,
+                    Orders.order_datetime,
+                ).join(Product, Product.id == Orders.product_id),
+            )
+        )
+        conn.execute(
+            insert(UserOrderStats).from_select(
+                ["user_id", "orders_count", "total_spent", "last_order_datetime"],
+                select(
+                    cls.user_id,
+                    func.count(cls.id),
+                    func.sum(cls.cost),
+                    func.max(cls.order_datetime),
+                ).group_by(cls.user_id),
+            )
+        )
+
+
+class UserOrderStats(BaseModel):
+    """
+    Итоги заказов пользователя: количество заказов, потрачено points и время последнего заказа.
+    """
+
+    __tablename__ = "user_order_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    orders_count = Column(Integer, default=0)
+    total_spent = Column(Integer, default=0)
+    last_order_datetime = Column(DateTime)
+
+    @classmethod
+    def add(cls, conn, user_id: int, orders: int, spent: int, last_order_datetime: datetime) -> None:
+        """
+        Эта функция увеличивает итоги пользователя, создавая строку при первом заказе.
+        """
+        values = {
+            "user_id": user_id,
+            "orders_count": orders,
+            "total_spent": spent,
+            "last_order_datetime": last_order_datetime,
+        }
+        dialect = conn.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            # Одновременные первые заказы пользователя не должны конфликтовать на вставке, поэтому используется
+            # `INSERT ... ON CONFLICT DO UPDATE`.
+            # Диалекты импортируются только при первом заказе, чтобы не замедлять запуск CLI.
+            from sqlalchemy.dialects import postgresql, sqlite
+
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            query = dialect_insert(cls).values(**values)
+            conn.execute(
+                query.on_conflict_do_update(
+                    index_elements=[cls.user_id],
+                    set_={
+                        "orders_count": cls.orders_count + query.excluded.orders_count,
+                        "total_spent": cls.total_spent + query.excluded.total_spent,
+                        "last_order_datetime": query.excluded.last_order_datetime,
+                    },
+                )
+            )
+            return
+
+        updated = conn.execute(
+            update(cls)
+            .where(cls.user_id == user_id)
+            .values(
+                orders_count=cls.orders_count + orders,
+                total_spent=cls.total_spent + spent,
+                last_order_datetime=last_order_datetime,
+            )
+        )
+        if updated.rowcount == 0:
+            conn.execute(insert(cls).values(**values))
+
+
+def _backfill_order_history(metadata, connection, tables=(), **kw) -> None:
+    """
+    Эта функция заполняет историю заказов и итоги пользователей по уже существующим заказам, когда `create_all`
+    впервые создает их таблицы (например, при развертывании на базе данных с заказами).
+    """
+    if OrderHistory.__table__ in tables or UserOrderStats.__table__ in tables:
+        OrderHistory._rebuild(connection)
+
+
+event.listen(BaseModel.metadata, "after_create", _backfill_order_history)
+
+
+class SalesRollup(BaseModel):
+    """
+    Продажи товара за день: количество заказов, проданных единиц и выручка в points. Таблица пополняется
+    инкрементально по `Orders.order_datetime` (см. `application.reports.refresh_rollup`).
+    """
+
+    __tablename__ = "sales_rollup"
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    orders_count = Column(Integer, default=0)
+    units = Column(Integer, default=0)
+    revenue = Column(Integer, default=0)
+
+
+class RollupState(BaseModel):
+    """
+    Состояние инкрементальных агрегатов: заказы с `order_datetime < watermark` уже учтены.
+    """
+
+    __tablename__ = "rollup_state"
+
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime, nullable=True)
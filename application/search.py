@@ -0,0 +1,53 @@
+from bisect import bisect_left
+from typing import Iterable
+
+
+class NameIndex:
+    """
+    Класс NameIndex — индекс названий в памяти процесса для баз данных без триграммных индексов (например, SQLite).
+
+    Названия хранятся в отсортированном массиве, поэтому поиск по префиксу — это двоичный поиск. Для поиска по
+    подстроке используется словарь триграмм: кандидаты получаются пересечением множеств идентификаторов для всех
+    триграмм строки, а затем проверяются. Поиск не зависит от регистра. Индекс не изменяется после создания,
+    поэтому его можно использовать из нескольких потоков.
+    """
+
+    def __init__(self, items: Iterable[tuple[int, str]]):
+        names = sorted((name.lower(), item_id) for item_id, name in items if name is not None)
+        self._keys = [name for name, _ in names]
+        self._ids = [item_id for _, item_id in names]
+        self._names = {item_id: name for name, item_id in names}
+        self._trigrams: dict[str, set[int]] = {}
+        for name, item_id in names:
+            for trigram in self._split(name):
+                self._trigrams.setdefault(trigram, set()).add(item_id)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def _split(text: str) -> set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def prefix(self, text: str) -> list[int]:
+        """
+        Метод возвращает отсортированные идентификаторы с названием, начинающимся с `text`.
+        """
+        text = text.lower()
+        start = bisect_left(self._keys, text)
+        end = bisect_left(self._keys, text + "\U0010ffff", lo=start)
+        return sorted(self._ids[start:end])
+
+    def substring(self, text: str) -> list[int]:
+        """
+        Метод возвращает отсортированные идентификаторы с названием, содержащим `text`.
+        """
+        text = text.lower()
+        trigrams = self._split(text)
+        if not trigrams:
+            # Для строк короче трех символов триграмм нет, названия проверяются полностью.
+            return sorted(item_id for item_id, name in self._names.items() if text in name)
+
+        postings = sorted((self._trigrams.get(trigram, set()) for trigram in trigrams), key=len)
+        candidates = set.intersection(*postings)
+        return sorted(item_id for item_id in candidates if text in self._names[item_id])
@@ -1,39 +1,157 @@
-from datetime import datetime
-
-import tabulate
 import sys
 
 
 from application.storage import AbstractStorage
-from .models import Ticket, Product, User, Orders
+from .auth import TokenCache
+from .cart import Cart
+from .catalog import CatalogCache
+from .dto import UserRow
+from .metrics import metrics
+from .table import print_table
+from .models import Ticket, User, Orders, OrderHistory, Product, PurchaseError, UserOrderStats
 
 
 class ShopService:
-    def __init__(self, storage: AbstractStorage):
+    PRODUCTS_PAGE_SIZE = 20
+
+    def __init__(
+        self,
+        storage: AbstractStorage,
+        catalog: CatalogCache = None,
+        persistent_storage: AbstractStorage = None,
+        cart: Cart = None,
+    ):
         self._storage = storage
-        self._user: User = None
+        self._persistent_storage = persistent_storage
+        self._tokens = TokenCache(persistent_storage) if persistent_storage is not None else None
+        self._token = None
+        self._catalog = catalog if catalog is not None else CatalogCache()
+        # Корзина сохраняется между запусками, если есть постоянное хранилище.
+        if cart is None:
+            cart = Cart(persistent_storage if persistent_storage is not None else storage)
+        self._cart = cart
+        self._user: UserRow = None
+        # Points восстановлены из токена прошлого запуска и могут быть устаревшими (см. `restore_current_user`).
+        self._points_stale = False
 
     @staticmethod
     def exit_prog() -> None:
         sys.exit()
 
     @staticmethod
-    def display_products() -> None:
+    def display_metrics() -> None:
+        """
+        Функция выводит собранные метрики (время пунктов меню, методов моделей и SQL-запросов) и сохраняет их
+        в файл `metrics.prom` в формате Prometheus.
+        """
+        print(metrics.dump() or " Метрик пока нет")
+        metrics.write_prometheus("metrics.prom")
+
+    @staticmethod
+    def display_reports() -> None:
+        """
+        Функция выводит отчет о продажах или остатках (см. `application.reports`) и по запросу сохраняет его в CSV в
+        каталог `reports.REPORTS_DIR`. Отчеты вычисляются в базе данных, заказы в программу не загружаются.
+        Пункт меню доступен только администраторам (см. `UserMenu`).
+        """
+        from . import reports
+
+        names = list(reports.REPORTS)
+        for i, name in enumerate(names, 1):
+            print(f" {i}. {reports.REPORTS[name][0]}")
+        choice = input("> Отчет: ").strip()
+        if not choice.isdigit() or not 1 <= int(choice) <= len(names):
+            return
+        days = input("> Период в днях (Enter — по умолчанию): ").strip()
+        if days and not days.isdigit():
+            print("Период должен быть числом")
+            return
+
+        name = names[int(choice) - 1]
+        headers, rows = reports.run_report(name, days=int(days) if days else None)
+        if not rows:
+            print(" Нет данных")
+            return
+        print_table(rows, headers=headers)
+
+        file_name = input("> Сохранить в CSV-файл (Enter — не сохранять): ").strip()
+        if file_name:
+            try:
+                reports.export_csv(name, file_name, days=int(days) if days else None)
+            except ValueError as error:
+                print(error)
+                return
+            print(f" Отчет сохранен в {reports.report_path(file_name)}")
+
+    def display_products(self) -> None:
         """
         Функция отображает таблицу информации о продукте, включая идентификатор, стоимость, количество и название.
+        Каталог выводится постранично по `PRODUCTS_PAGE_SIZE` товаров, следующая страница загружается по запросу.
+        По запросу «a» оставшаяся часть каталога выводится целиком потоком из серверного курсора.
+        """
+        headers = ["ID", "Стоимость", "Кол-во", "Название"]
+        after_id = 0
+        while True:
+            # Метод `self._catalog.page()` возвращает страницу продуктов (из кэша, если каталог не менялся), далее
+            # для каждого продукта выбираются идентификатор, стоимость, количество и название, и строки выводятся
+            # функцией `print_table()`.
+            page = self._catalog.page(after_id=after_id, limit=self.PRODUCTS_PAGE_SIZE)
+            print_table(((p.id, p.cost, p.count, p.name) for p in page), headers=headers)
+
+            if len(page) < self.PRODUCTS_PAGE_SIZE:
+                break
+            answer = input(" Enter — следующая страница, a — весь каталог, q — назад: ").strip().lower()
+            if answer == "q":
+                break
+            after_id = page[-1].id
+            if answer == "a":
+                # Ширина колонок вычисляется в базе данных, поэтому строки выводятся сразу и не накапливаются в памяти.
+                print_table(
+                    ((p.id, p.cost, p.count, p.name) for p in Product.iter_rows(Product.id > after_id)),
+                    headers=headers,
+                    widths=Product.max_lengths("id", "cost", "count", "name"),
+                )
+                break
+
+    def search_products(self) -> None:
         """
+        Функция ищет товары по названию или его началу и фильтрует их по стоимости и наличию. Пустой ответ
+        означает отсутствие условия. Результаты выводятся постранично, как в `display_products`.
+        """
+        text = input("> Название или его часть: ").strip()
+        prefix = text.endswith("*")
+        min_cost = input("> Стоимость от: ").strip()
+        max_cost = input("> Стоимость до: ").strip()
+        in_stock = input("> Только в наличии (y/n): ").strip().lower() == "y"
+        if not (min_cost or "0").isdigit() or not (max_cost or "0").isdigit():
+            print("Стоимость должна быть числом")
+            return
 
-        # Метод `Product.all()` возвращает список всех продуктов в системе, далее создается список для извлечения
-        # соответствующей информации для каждого продукта и создания нового списка списков.
-        # Затем этот список используется для отображения информации о продуктах в отформатированной таблице
-        # с помощью функции `tabulate.tabulate()`.
-        products = [[p.id, p.cost, p.count, p.name] for p in Product.all()]
+        filters = {
+            # Звездочка в конце строки означает поиск по началу названия.
+            "text": text.rstrip("*"),
+            "prefix": prefix,
+            "min_cost": int(min_cost) if min_cost else None,
+            "max_cost": int(max_cost) if max_cost else None,
+            "in_stock": in_stock,
+        }
+        after_id = 0
+        while True:
+            page = self._catalog.search(after_id=after_id, limit=self.PRODUCTS_PAGE_SIZE, **filters)
+            if not page and after_id == 0:
+                print(" Ничего не найдено")
+                return
 
-        print(
-            tabulate.tabulate(
-                products, headers=["ID", "Стоимость", "Кол-во", "Название"]
+            print_table(
+                ((p.id, p.cost, p.count, p.name) for p in page),
+                headers=["ID", "Стоимость", "Кол-во", "Название"],
             )
-        )
+
+            if len(page) < self.PRODUCTS_PAGE_SIZE:
+                break
+            if input(" Enter — следующая страница, q — назад: ").strip().lower() == "q":
+                break
+            after_id = page[-1].id
 
     def register(self) -> None:
         """
@@ -61,7 +179,7 @@ class ShopService:
 
             break
 
-        user = User.create(username=username, password=password, points=0)
+        user = User.register(username=username, password=password)
         # `self._login_user(user)` — это метод, который устанавливает текущего пользователя для предоставленного
         # пользователя и сохраняет его в объекте `_storage`. Он вызывается после того, как пользователь успешно войдет в
         # систему или зарегистрируется.
@@ -80,38 +198,68 @@ class ShopService:
         чего пользователь войдет в систему.
         """
 
-        while True:
-            username = input("> Введите username: ")
-            if not User.is_exist(username=username):
-                print(" Такой username не существует!")
-                return
+        username = input("> Введите username: ")
+        # Пользователь загружается один раз, дальше пароль проверяется по его хэшу без запросов к базе данных.
+        user = User.get(username=username)
+        if user is None:
+            print(" Такой username не существует!")
+            return
 
+        while True:
             password = input("> Введите password: ")
-            user = User.get(username=username, password=password)
-            if user is None:
-                print("Неверный пароль!")
-                continue
-            break
+            if user.check_password(password):
+                break
+            print("Неверный пароль!")
 
         self._login_user(user)
-        self.write_current_user(username)
+        self.write_current_user(user)
 
-    @staticmethod
-    def write_current_user(data: str) -> None:
-        with open('user_login.txt', 'w') as file:
-            file.write(data)
+    def write_current_user(self, user: User) -> None:
+        """
+        Метод выдает токен сессии и запоминает его в постоянном хранилище, чтобы при следующем запуске войти
+        автоматически без проверки пароля и запросов к базе данных (см. `restore_current_user`).
+        """
+        if self._tokens is None:
+            return
+        previous = self._persistent_storage.get("token")
+        if previous is not None:
+            self._tokens.revoke(previous)
+        self._token = self._tokens.issue(user)
+        self._persistent_storage.set(name="token", item=self._token)
+
+    def restore_current_user(self) -> None:
+        """
+        Метод выполняет вход под пользователем, токен которого сохранен в постоянном хранилище при прошлом запуске.
+        Данные пользователя берутся из кэша токенов, поэтому запросов к базе данных не выполняется. Points в токене
+        сохранены при входе и обновляются из базы данных при первом показе профиля.
+        """
+        if self._tokens is None:
+            return
+        token = self._persistent_storage.get("token")
+        if token is None:
+            return
+        data = self._tokens.get(token)
+        if data is not None:
+            self._token = token
+            self._login_user(UserRow(**data))
+            self._points_stale = True
 
-    def _login_user(self, user: User) -> None:
+    def _login_user(self, user) -> None:
         """
-        Это закрытый метод, который регистрирует пользователя и принимает объект User в качестве входных данных.
+        Это закрытый метод, который регистрирует пользователя и принимает объект User или UserRow в качестве входных
+        данных. В хранилище сохраняется только легкий объект `UserRow` без пароля и состояния ORM.
         """
+        user = UserRow(user.id, user.username, user.points)
         self._storage.set(name="user", item=user)
         self._user = user
+        self._points_stale = False
 
-    def _update_user(self, user: User) -> None:
+    def _update_user(self, user: UserRow) -> None:
         """
-        Это закрытый метод, который обновляет пользовательский объект.
+        Это закрытый метод, который обновляет пользовательский объект. Токен в постоянном хранилище не
+        перезаписывается: он хранит только данные для входа, а points не записываются на диск после каждого действия.
         """
+        self._user = user
         self._storage.set(name="user", item=user)
 
     def submit_ticket(self) -> None:
@@ -120,22 +268,16 @@ class ShopService:
         доступность ticket'а и информацию о пользователе.
         """
         ticket_uuid = input("> Введите ticket: ")
-        if not Ticket.is_valid(ticket_uuid):
+
+        # Погашение ticket'а и начисление points выполняются одной транзакцией.
+        points = Ticket.redeem(ticket_uuid, user_id=self._user.id)
+        if points is None:
             print(" Неверный ticket!")
             return
 
-        ticket: Ticket = Ticket.get(uuid=ticket_uuid)
-
-        # Эти строки кода обновляют points текущего пользователя, добавляя 20 points, а затем обновляя объект
-        # пользователя в хранилище новым значением баллов. Это делается, когда пользователь отправляет
-        # действительный ticket.
-        self._user.points += 20
-        self._user.update(points=self._user.points)
-        self._update_user(self._user)
+        self._update_user(self._user._replace(points=points))
 
-        ticket.update(available=False, user=self._user.id)
-
-        print(" Было добавлено 20 поинтов")
+        print(f" Было добавлено {Ticket.POINTS} поинтов")
 
     def buy_product(self) -> None:
         """
@@ -148,31 +290,73 @@ class ShopService:
             print("ID должен быть числом")
             return
 
-        product: Product = Product.get(id=int(product_id))
+        # Несуществующий товар отсекается по кэшу каталога без обращения к базе данных.
+        if self._catalog.product(int(product_id)) is None:
+            print("Такого продукта не существует")
+            return
+
+        # Списание points, уменьшение количества товара и создание заказа выполняются в одной транзакции.
+        try:
+            product_name, points = Orders.purchase(user_id=self._user.id, product_id=int(product_id))
+        except PurchaseError as error:
+            print(error)
+            return
+
+        self._update_user(self._user._replace(points=points))
+
+        print(f"Спасибо, что купили {product_name}")
+
+    def add_to_cart(self) -> None:
+        """
+        Функция добавляет товар в корзину пользователя. Наличие товара и points проверяются при оформлении заказа.
+        """
+        product_id = input(" Укажите ID товара: ")
+        count = input(" Укажите количество: ") or "1"
+        if not product_id.isdigit() or not count.isdigit() or int(count) < 1:
+            print("ID и количество должны быть положительными числами")
+            return
+
+        product = self._catalog.product(int(product_id))
         if product is None:
             print("Такого продукта не существует")
             return
 
-        if self._user.points < product.cost:
-            print("У вас недостаточно поинтов")
+        self._cart.add(self._user.id, product.id, int(count))
+        print(f" {product.name} x {count} добавлен в корзину")
+
+    def display_cart(self) -> None:
+        """
+        Функция выводит содержимое корзины и ее стоимость по ценам из кэша каталога.
+        """
+        items = self._cart.items(self._user.id)
+        if not items:
+            print(" Корзина пуста")
             return
 
-        Orders.create(
-            user=self._user,
-            product=product,
-            count=1,
-            order_datetime=datetime.now(),
-        )
+        rows = []
+        for product_id, count in sorted(items.items()):
+            product = self._catalog.product(product_id)
+            if product is None:
+                rows.append([product_id, "—", count, "—"])
+            else:
+                rows.append([product_id, product.name, count, product.cost * count])
+        print_table(rows, headers=["ID", "Название", "Кол-во", "Стоимость"])
+        print(f" Итого: {sum(row[3] for row in rows if row[3] != '—')} points")
+
+    def checkout(self) -> None:
+        """
+        Функция оформляет заказ на все товары корзины одной транзакцией: количество товаров, points пользователя и
+        заказы меняются вместе или не меняются вовсе.
+        """
+        try:
+            bought, points = self._cart.checkout(self._user.id)
+        except PurchaseError as error:
+            print(error)
+            return
 
-        # Эти строки кода обновляют points пользователя, вычитая стоимость продукта, который они покупают,
-        # обновляют points пользователя, уменьшают количество продуктов на 1 и обновляют информацию о
-        # пользователе в хранилище.
-        self._user.points -= product.cost
-        self._user.update(points=self._user.points)
-        product.update(count=product.count-1)
-        self._update_user(self._user)
+        self._update_user(self._user._replace(points=points))
 
-        print(f"Спасибо, что купили {product.name}")
+        print(f"Спасибо, что купили {', '.join(f'{name} x {count}' for name, count in bought)}")
 
     def change_profile(self) -> None:
         print(f" Выход из профиля: {self._user.username}")
@@ -183,31 +367,32 @@ class ShopService:
         """
         Функция выводит информацию о профиле пользователя и историю его заказов, если таковая имеется.
         """
+        if self._points_stale:
+            self._update_user(User.get_row(id=self._user.id))
+            self._points_stale = False
 
         print(f" Ваш профиль: \n {self._user.username}\n Points: {self._user.points}")
 
-        orders = Orders.filter(user_id=self._user.id)
+        # Итоги берутся из `UserOrderStats`, а история читается из денормализованной проекции по индексу
+        # `(user_id, order_datetime)` через серверный курсор и выводится построчно, не накапливаясь в памяти.
+        stats = UserOrderStats.get(user_id=self._user.id)
 
-        if not orders:
+        if stats is None or not stats.orders_count:
             print(" У вас нет заказов")
         else:
-            print(
-                tabulate.tabulate(
-                    # Это понимание списка, которое создает список списков, содержащих информацию о каждом заказе,
-                    # сделанном текущим пользователем. Каждый внутренний список содержит идентификатор заказа, название
-                    # заказанного продукта (полученное с помощью метода `Product.get()` с сохраненным в заказе
-                    # идентификатором продукта), количество заказанных продуктов, а также дату и время заказа.
-                    # Полученный список списков затем передается методу `tabulate.tabulate()`, чтобы создать
-                    # отформатированную таблицу для отображения.
-                    [
-                        [
-                            o.id,
-                            Product.get(id=o.product_id).name,
-                            o.count,
-                            o.order_datetime,
-                        ]
-                        for o in orders
-                    ],
-                    headers=["ID", "Название", "Кол-во", "Дата и время заказа"],
-                )
+            print(f" Заказов: {stats.orders_count}, потрачено points: {stats.total_spent}")
+            orders = OrderHistory.iter_rows(
+                user_id=self._user.id,
+                order_by=(OrderHistory.order_datetime, OrderHistory.id),
+            )
+            print_table(
+                # Для каждого заказа выводятся идентификатор заказа, название заказанного продукта (сохраненное в строке
+                # истории), количество заказанных продуктов, а также дата и время заказа.
+                ((o.order_id, o.product_name, o.count, o.order_datetime) for o in orders),
+                headers=["ID", "Название", "Кол-во", "Дата и время заказа"],
+                # Ширина колонок известна заранее, кроме даты и времени, ширина которых постоянна.
+                widths=[
+                    *OrderHistory.max_lengths("order_id", "product_name", "count", user_id=self._user.id),
+                    None,
+                ],
             )
@@ -1,3 +1,5 @@
 from .memory_storage import MemoryStorage
 from .file_storage import FileStorage
 from .base import AbstractStorage
+from .lru_storage import LRUStorage
+from .shared_storage import SharedMemoryStorage
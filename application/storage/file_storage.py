@@ -1,19 +1,169 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from threading import Lock
+
 from .base import AbstractStorage
 
 
 class FileStorage(AbstractStorage):
+    """
+    Класс FileStorage — это реализация интерфейса AbstractStorage, которая хранит элементы в файле-журнале.
+
+    Каждая операция дописывает в конец файла одну JSON-строку: `{"k": имя, "v": значение}` для `set` и
+    `{"k": имя, "d": 1}` для `delete`. Запись сбрасывается на диск через `fsync`, поэтому после падения процесса
+    теряется не больше одной незавершенной строки, которая отбрасывается при следующем открытии.
+
+    В памяти хранится индекс «имя -> (смещение, длина)» последней записи, поэтому `get` читает с диска ровно одну
+    строку. Когда устаревших записей становится больше `compact_threshold`, журнал переписывается заново
+    (только актуальные значения) и атомарно заменяет старый файл.
+
+    Файл могут одновременно использовать несколько процессов: все операции выполняются под блокировкой
+    `fcntl.flock` файла `<file_name>.lock`, а перед каждой операцией индекс дополняется строками, дописанными другими
+    процессами, или строится заново, если другой процесс заменил файл при сжатии.
+
+    Значения должны сериализоваться в JSON.
+    """
 
-    def __init__(self, file_name):
+    def __init__(self, file_name: str, compact_threshold: int = 1000):
         self._file_name = file_name
+        self._compact_threshold = compact_threshold
+        self._lock = Lock()
+        self._index: dict[str, tuple[int, int]] = {}
+        self._stale = 0
+        self._end = 0
+        self._lock_fd = os.open(f"{file_name}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        self._file = open(self._file_name, "a+b")
+        with self._locked():
+            self._load()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Блокировка операций потоков этого процесса и других процессов.
+        """
+        with self._lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _sync(self) -> None:
+        """
+        Метод учитывает изменения файла, сделанные другими процессами. Вызывается под блокировкой.
+        """
+        try:
+            stat = os.stat(self._file_name)
+        except FileNotFoundError:
+            stat = None
+        if stat is None or stat.st_ino != os.fstat(self._file.fileno()).st_ino:
+            self._file.close()
+            self._file = open(self._file_name, "a+b")
+            self._load()
+        elif stat.st_size != self._end:
+            self._load(self._end if stat.st_size > self._end else 0)
+
+    def _load(self, offset: int = 0) -> None:
+        """
+        Метод строит индекс по файлу-журналу, начиная со смещения `offset` (0 — заново), и обрезает недописанную
+        последнюю строку.
+        """
+        if offset == 0:
+            self._index.clear()
+            self._stale = 0
+        self._file.seek(offset)
+        for line in self._file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+
+            if record["k"] in self._index:
+                self._stale += 1
+            if "d" in record:
+                self._index.pop(record["k"], None)
+                self._stale += 1
+            else:
+                self._index[record["k"]] = (offset, len(line))
+            offset += len(line)
+
+        self._file.truncate(offset)
+        self._end = offset
+        self._file.seek(0, os.SEEK_END)
+
+    def _append(self, record: dict) -> tuple[int, int]:
+        data = json.dumps(record, ensure_ascii=False).encode() + b"\n"
+        offset = self._file.seek(0, os.SEEK_END)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._end = offset + len(data)
+        return offset, len(data)
 
     def get(self, name: str):
-        with open(self._file_name) as f:
-            pass
+        with self._locked():
+            self._sync()
+            position = self._index.get(name)
+            if position is None:
+                return None
+            offset, length = position
+            self._file.seek(offset)
+            return json.loads(self._file.read(length))["v"]
 
     def set(self, name: str, item):
-        with open(self._file_name, "w") as f:
-            pass
+        with self._locked():
+            self._sync()
+            if name in self._index:
+                self._stale += 1
+            self._index[name] = self._append({"k": name, "v": item})
+            self._maybe_compact()
 
     def delete(self, name: str):
-        with open(self._file_name, "w") as f:
-            pass
+        with self._locked():
+            self._sync()
+            if self._index.pop(name, None) is None:
+                return
+            self._append({"k": name, "d": 1})
+            self._stale += 2
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if self._stale >= self._compact_threshold:
+            self._compact()
+
+    def compact(self) -> None:
+        """
+        Метод переписывает журнал, оставляя только актуальные значения.
+        """
+        with self._locked():
+            self._sync()
+            self._compact()
+
+    def _compact(self) -> None:
+        tmp_name = f"{self._file_name}.compact"
+        with open(tmp_name, "wb") as tmp:
+            for offset, length in self._index.values():
+                self._file.seek(offset)
+                tmp.write(self._file.read(length))
+            tmp.flush()
+            os.fsync(tmp.fileno())
+
+        self._file.close()
+        os.replace(tmp_name, self._file_name)
+        directory = os.open(os.path.dirname(os.path.abspath(self._file_name)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+        self._file = open(self._file_name, "a+b")
+        self._load()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+            os.close(self._lock_fd)
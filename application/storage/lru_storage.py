@@ -0,0 +1,45 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from .base import AbstractStorage
+
+
+class LRUStorage(AbstractStorage):
+    """
+    Класс LRUStorage — это реализация интерфейса AbstractStorage, которая хранит ограниченное количество элементов
+    в памяти. При переполнении удаляется элемент, к которому дольше всего не обращались, а элементы старше `ttl`
+    секунд считаются отсутствующими.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self._items: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._max_size = max_size
+        self._ttl = ttl
+        self._lock = Lock()
+
+    def get(self, name: str):
+        with self._lock:
+            try:
+                created, item = self._items[name]
+            except KeyError:
+                return None
+
+            if self._ttl is not None and time.monotonic() - created > self._ttl:
+                del self._items[name]
+                return None
+
+            self._items.move_to_end(name)
+            return item
+
+    def set(self, name: str, item):
+        with self._lock:
+            self._items[name] = (time.monotonic(), item)
+            self._items.move_to_end(name)
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, name: str):
+        with self._lock:
+            self._items.pop(name, None)
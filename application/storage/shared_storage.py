@@ -0,0 +1,211 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Optional
+
+from .base import AbstractStorage
+
+_MAGIC = b"NMS2"
+# magic, количество слотов, размер слота.
+_FILE_HEADER = struct.Struct("<4sII")
+# Счетчик версии (seqlock), хэш ключа, длина ключа, длина значения, время записи (`time.time()`).
+_SLOT_HEADER = struct.Struct("<IQHId")
+
+_EMPTY = 0
+_DELETED = 0xFFFF
+
+# Сколько раз читатель повторяет чтение слота без блокировки, прежде чем взять блокировку записи.
+_READ_RETRIES = 1000
+
+
+class SharedMemoryStorage(AbstractStorage):
+    """
+    Класс SharedMemoryStorage — это реализация интерфейса AbstractStorage в файле, отображенном в память (mmap),
+    который могут одновременно открыть несколько процессов на одной машине.
+
+    Файл состоит из `slots` слотов фиксированного размера `slot_size`, поэтому объем памяти ограничен заранее.
+    Слот выбирается по хэшу ключа с линейным пробированием. Значения сериализуются через `pickle`.
+
+    Хранилище не переполняется: если среди `max_probes` слотов ключа нет свободного, запись занимает слот с
+    устаревшим значением (старше `ttl` секунд), а если таких нет — слот с самой старой записью. Значения старше
+    `ttl` не возвращаются из `get`.
+
+    Чтение выполняется без блокировок: каждый слот защищен счетчиком версии (seqlock), писатель делает его нечетным
+    на время записи, а читатель повторяет чтение, если счетчик был нечетным или изменился. Записи разных процессов
+    упорядочиваются блокировкой файла `fcntl.lockf`. Если счетчик остается нечетным слишком долго (процесс-писатель
+    завершился во время записи), читатель берет блокировку и освобождает поврежденный слот.
+    """
+
+    def __init__(
+        self,
+        file_name: str,
+        slots: int = 4096,
+        slot_size: int = 512,
+        max_probes: int = 32,
+        ttl: Optional[float] = None,
+    ):
+        self._lock = Lock()
+        self._fd = os.open(file_name, os.O_RDWR | os.O_CREAT, 0o600)
+
+        size = _FILE_HEADER.size + slots * slot_size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, _FILE_HEADER.pack(_MAGIC, slots, slot_size), 0)
+            magic, file_slots, file_slot_size = _FILE_HEADER.unpack(os.pread(self._fd, _FILE_HEADER.size, 0))
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        if magic != _MAGIC:
+            os.close(self._fd)
+            raise ValueError(f"{file_name} не является файлом SharedMemoryStorage этой версии, удалите его")
+        if (file_slots, file_slot_size) != (slots, slot_size):
+            os.close(self._fd)
+            raise ValueError(
+                f"{file_name} создан с slots={file_slots}, slot_size={file_slot_size}, а запрошено "
+                f"slots={slots}, slot_size={slot_size}; удалите файл, чтобы создать его заново"
+            )
+
+        self._slots = slots
+        self._slot_size = slot_size
+        self._max_probes = min(max_probes, slots)
+        self._ttl = ttl
+        self._mmap = mmap.mmap(self._fd, _FILE_HEADER.size + slots * slot_size)
+
+    @staticmethod
+    def _hash(key: bytes) -> int:
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+    def _offset(self, slot: int) -> int:
+        return _FILE_HEADER.size + slot * self._slot_size
+
+    def _probe(self, key_hash: int):
+        start = key_hash % self._slots
+        for i in range(self._max_probes):
+            yield (start + i) % self._slots
+
+    def _read_slot(self, slot: int, locked: bool = False) -> tuple[int, int, bytes, bytes, float]:
+        """
+        Метод возвращает согласованный снимок слота: хэш и длину ключа, ключ, значение и время записи.
+
+        :param locked: Вызывающий уже держит блокировку записи, поэтому нечетный счетчик означает, что писатель
+         завершился во время записи.
+        """
+        offset = self._offset(slot)
+        for _ in range(_READ_RETRIES):
+            seq, key_hash, key_len, val_len, written = _SLOT_HEADER.unpack_from(self._mmap, offset)
+            if seq % 2:
+                if locked:
+                    # Запись прервана: слот освобождается, а счетчик снова становится четным.
+                    self._write_slot(slot, 0, _DELETED, b"")
+                    return 0, _DELETED, b"", b"", 0.0
+                continue
+            key = value = b""
+            if key_len not in (_EMPTY, _DELETED):
+                data_offset = offset + _SLOT_HEADER.size
+                key = self._mmap[data_offset:data_offset + key_len]
+                value = self._mmap[data_offset + key_len:data_offset + key_len + val_len]
+            if _SLOT_HEADER.unpack_from(self._mmap, offset)[0] == seq:
+                return key_hash, key_len, key, value, written
+
+        # Счетчик слишком долго нечетный: дальше слот читается под блокировкой записи.
+        with self._write_lock():
+            return self._read_slot(slot, locked=True)
+
+    def _write_slot(self, slot: int, key_hash: int, key_len: int, data: bytes) -> None:
+        offset = self._offset(slot)
+        val_len = len(data) - key_len if key_len != _DELETED else 0
+        seq = _SLOT_HEADER.unpack_from(self._mmap, offset)[0]
+        # Счетчик должен стать нечетным на время записи, даже если прошлая запись была прервана.
+        seq = (seq + 1 if seq % 2 == 0 else seq) & 0xFFFFFFFF
+        # Байты записываются присваиванием среза, а не `pack_into`: `pack_into` сначала обнуляет область, и читатель
+        # мог бы увидеть пустой слот с четным счетчиком.
+        self._mmap[offset:offset + 4] = struct.pack("<I", seq)
+        self._mmap[offset + _SLOT_HEADER.size:offset + _SLOT_HEADER.size + len(data)] = data
+        self._mmap[offset:offset + _SLOT_HEADER.size] = _SLOT_HEADER.pack(
+            seq, key_hash, key_len, val_len, time.time()
+        )
+        self._mmap[offset:offset + 4] = struct.pack("<I", (seq + 1) & 0xFFFFFFFF)
+
+    def _expired(self, written: float) -> bool:
+        return self._ttl is not None and written < time.time() - self._ttl
+
+    def _find(self, key: bytes, key_hash: int, locked: bool = False):
+        """
+        Метод возвращает номер слота с ключом, его значение и время записи, либо `(None, None, None)`, если ключа нет.
+        """
+        for slot in self._probe(key_hash):
+            slot_hash, key_len, slot_key, value, written = self._read_slot(slot, locked)
+            if key_len == _EMPTY:
+                break
+            if key_len != _DELETED and slot_hash == key_hash and slot_key == key:
+                return slot, value, written
+        return None, None, None
+
+    def get(self, name: str):
+        key = name.encode()
+        _, value, written = self._find(key, self._hash(key))
+        if value is None or self._expired(written):
+            return None
+        return pickle.loads(value)
+
+    def set(self, name: str, item):
+        key = name.encode()
+        if not key:
+            raise ValueError("Ключ SharedMemoryStorage не может быть пустым")
+        data = key + pickle.dumps(item)
+        if _SLOT_HEADER.size + len(data) > self._slot_size:
+            raise ValueError(f"Значение {name!r} не помещается в слот размером {self._slot_size} байт")
+
+        key_hash = self._hash(key)
+        with self._write_lock():
+            slot, _, _ = self._find(key, key_hash, locked=True)
+            if slot is None:
+                slot = self._free_slot(key_hash)
+            self._write_slot(slot, key_hash, len(key), data)
+
+    def delete(self, name: str):
+        key = name.encode()
+        key_hash = self._hash(key)
+        with self._write_lock():
+            slot, _, _ = self._find(key, key_hash, locked=True)
+            if slot is not None:
+                self._write_slot(slot, 0, _DELETED, b"")
+
+    def _free_slot(self, key_hash: int) -> int:
+        """
+        Метод выбирает слот для нового ключа: свободный или удаленный, иначе с устаревшим значением, иначе с самой
+        старой записью среди слотов пробирования. Вызывается под блокировкой записи.
+        """
+        oldest_slot, oldest_written = None, None
+        for slot in self._probe(key_hash):
+            _, key_len, _, _, written = self._read_slot(slot, locked=True)
+            if key_len in (_EMPTY, _DELETED) or self._expired(written):
+                return slot
+            if oldest_written is None or written < oldest_written:
+                oldest_slot, oldest_written = slot, written
+        # Вытесненный ключ перезаписывается, а не удаляется, поэтому цепочки пробирования других ключей не рвутся.
+        return oldest_slot
+
+    @contextmanager
+    def _write_lock(self):
+        """
+        Блокировка записи: сначала между потоками процесса, затем между процессами.
+        """
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
+
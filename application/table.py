@@ -0,0 +1,73 @@
+"""
+Потоковый вывод таблиц.
+
+В отличие от `tabulate`, таблица не собирается в одну строку: ширина колонок вычисляется по первым `sample_size`
+строкам (или передается заранее, например из `BaseModel.max_lengths`), после чего строки выводятся по одной по
+мере получения из генератора. Вывод начинается сразу, а память не зависит от количества строк.
+
+Формат совпадает с форматом `tabulate` по умолчанию: заголовок, строка из `-` и колонки, разделенные двумя пробелами.
+Числовые колонки выравниваются вправо. Текстовые значения длиннее ширины колонки обрезаются, а числа выводятся
+полностью, даже если строка из-за этого сдвигается: обрезанное число выглядит как другое число.
+"""
+import sys
+from itertools import chain, islice
+from numbers import Number
+from typing import Iterable, Optional, Sequence, TextIO
+
+# Сколько строк используется для вычисления ширины колонок.
+SAMPLE_SIZE = 100
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, Number) and not isinstance(value, bool)
+
+
+def _fit(text: str, width: int, right: bool, number: bool = False) -> str:
+    if len(text) > width and not number:
+        text = text[:width - 1] + "…"
+    return text.rjust(width) if right else text.ljust(width)
+
+
+def print_table(
+    rows: Iterable[Sequence],
+    headers: Sequence[str],
+    widths: Optional[Sequence[Optional[int]]] = None,
+    sample_size: int = SAMPLE_SIZE,
+    file: Optional[TextIO] = None,
+) -> int:
+    """
+    Эта функция выводит таблицу, читая строки из `rows` по одной.
+
+    :param rows: Итерируемый объект строк (например, генератор `BaseModel.iter_rows`).
+    :param headers: Заголовки колонок.
+    :param widths: Известная ширина колонок; `None` для колонки означает вычисление по выборке.
+    :param sample_size: Количество первых строк, по которым вычисляется ширина колонок.
+    :param file: Куда выводить таблицу, по умолчанию `sys.stdout`.
+    :return: Количество выведенных строк.
+    """
+    file = file if file is not None else sys.stdout
+    rows = iter(rows)
+    sample = list(islice(rows, sample_size))
+
+    widths = list(widths) if widths is not None else [None] * len(headers)
+    for i, header in enumerate(headers):
+        if widths[i] is None:
+            widths[i] = max((len(_text(row[i])) for row in sample), default=0)
+        widths[i] = max(widths[i], len(header))
+    right = [any(_is_number(row[i]) for row in sample) for i in range(len(headers))]
+
+    file.write("  ".join(_fit(header, width, r) for header, width, r in zip(headers, widths, right)).rstrip() + "\n")
+    file.write("  ".join("-" * width for width in widths) + "\n")
+
+    count = 0
+    for row in chain(sample, rows):
+        cells = (_fit(_text(value), width, r, _is_number(value)) for value, width, r in zip(row, widths, right))
+        file.write("  ".join(cells).rstrip())
+        file.write("\n")
+        count += 1
+    file.flush()
+    return count
@@ -0,0 +1,204 @@
+"""
+Нагрузочный тест основных операций ShopService.
+
+Скрипт создает базу данных с заданным количеством пользователей, товаров, тикетов и заказов, затем `--users`
+потоков одновременно выполняют операции магазина. Ввод пользователя подменяется (`input()`), вывод подавляется.
+Для каждой операции выводятся пропускная способность, перцентили задержки и количество SQL-запросов, а также
+общая пропускная способность всех операций. При сравнении с сохраненными результатами выводится изменение
+пропускной способности и p95.
+
+Внимание: таблицы базы данных `--dsn` удаляются и создаются заново.
+
+Пример:
+    python -m benchmarks.shop_bench --dsn sqlite:///bench.db --users 8 --iterations 200 --save baseline.json
+    python -m benchmarks.shop_bench --dsn sqlite:///bench.db --compare baseline.json
+"""
+import argparse
+import builtins
+import io
+import json
+import os
+import random
+import threading
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from application.auth import hash_password
+from application.bulk import import_records
+from application.db import BaseModel, session
+from application.metrics import metrics
+from application.models import OrderHistory, Orders, Product, Ticket, User
+from application.service import ShopService
+from application.storage import MemoryStorage
+
+OPERATIONS = ("display_products", "login", "register", "buy_product", "submit_ticket", "profile")
+PASSWORD = "benchmark-password"
+
+# Ответы для `input()` текущего потока.
+_answers = threading.local()
+
+
+def _fake_input(prompt: str = "") -> str:
+    return _answers.queue.pop(0)
+
+
+def seed(users: int, products: int, tickets: int, orders: int) -> list[str]:
+    """
+    Функция заполняет базу данных тестовыми данными и возвращает коды непогашенных тикетов.
+    """
+    BaseModel.metadata.drop_all(bind=session.engine)
+    session.create_tables()
+    password_hash = hash_password(PASSWORD)
+    import_records(
+        User,
+        ({"username": f"bench-user-{i}", "password": password_hash, "points": 10 ** 9} for i in range(users)),
+    )
+    import_records(
+        Product,
+        ({"name": f"bench-product-{i}", "cost": 1, "count": 10 ** 9} for i in range(products)),
+    )
+    import_records(
+        Orders,
+        (
+            {
+                "user_id": random.randint(1, users),
+                "product_id": random.randint(1, products),
+                "count": 1,
+                "order_datetime": datetime.now(),
+            }
+            for _ in range(orders)
+        ),
+    )
+    OrderHistory.rebuild()
+    return list(Ticket.mint(tickets))
+
+
+def _answers_for(operation: str, worker: int, step: int, tickets: list[str], products: int) -> list[str]:
+    if operation == "display_products":
+        return ["q"]
+    if operation == "login":
+        return [f"bench-user-{worker}", PASSWORD]
+    if operation == "register":
+        return [f"bench-new-{os.getpid()}-{worker}-{step}-{time.time_ns()}", PASSWORD]
+    if operation == "buy_product":
+        return [str(random.randint(1, products))]
+    if operation == "submit_ticket":
+        return [tickets.pop() if tickets else "missing-ticket"]
+    return []
+
+
+def _worker(worker: int, iterations: int, tickets: list[str], products: int, latencies: dict, errors: dict):
+    service = ShopService(storage=MemoryStorage())
+    service._login_user(User.get(username=f"bench-user-{worker}"))
+    for step in range(iterations):
+        for operation in OPERATIONS:
+            _answers.queue = _answers_for(operation, worker, step, tickets, products)
+            start = time.perf_counter()
+            try:
+                with metrics.action(operation):
+                    getattr(service, operation)()
+            except Exception:
+                errors[operation] = errors.get(operation, 0) + 1
+            latencies[operation].append(time.perf_counter() - start)
+            if operation == "register":
+                # После регистрации нужно вернуться к пользователю с points для следующих операций.
+                service._login_user(User.get(username=f"bench-user-{worker}"))
+
+
+def run(users: int, iterations: int, tickets: list[str], products: int) -> dict:
+    """
+    Функция запускает `users` потоков по `iterations` циклов всех операций и возвращает результаты.
+    """
+    metrics.reset()
+    latencies = {operation: [] for operation in OPERATIONS}
+    errors = {}
+    original_input = builtins.input
+    builtins.input = _fake_input
+    threads = [
+        threading.Thread(target=_worker, args=(i, iterations, tickets, products, latencies, errors))
+        for i in range(users)
+    ]
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        builtins.input = original_input
+    elapsed = time.perf_counter() - start
+
+    results = {}
+    for operation, samples in latencies.items():
+        samples.sort()
+        count = len(samples)
+        # Операции выполняются по очереди в каждом из `users` потоков, поэтому пропускная способность операции
+        # считается по ее собственному времени, а не по общему времени теста, одинаковому для всех операций.
+        busy = sum(samples)
+        results[operation] = {
+            "count": count,
+            "errors": errors.get(operation, 0),
+            "ops_per_second": count / busy * users if busy else 0.0,
+            "p50_ms": samples[int(0.5 * count)] * 1000 if samples else 0.0,
+            "p95_ms": samples[min(count - 1, int(0.95 * count))] * 1000 if samples else 0.0,
+            "p99_ms": samples[min(count - 1, int(0.99 * count))] * 1000 if samples else 0.0,
+            "queries_per_op": metrics.counter("db_queries_total", action=operation) / count if count else 0.0,
+        }
+    return {
+        "elapsed_seconds": elapsed,
+        "users": users,
+        "iterations": iterations,
+        "ops_per_second": sum(len(samples) for samples in latencies.values()) / elapsed,
+        "operations": results,
+    }
+
+
+def _change(row: dict, before: dict, key: str, label: str) -> str:
+    if not before.get(key):
+        return ""
+    return f"  {label} {(row[key] - before[key]) / before[key] * 100:+.1f}%"
+
+
+def report(results: dict, baseline: dict = None) -> None:
+    print(f" Пользователей: {results['users']}, циклов: {results['iterations']}, "
+          f"время: {results['elapsed_seconds']:.2f} c, всего оп/с: {results['ops_per_second']:.1f}"
+          f"{_change(results, baseline, 'ops_per_second', 'оп/с') if baseline else ''}")
+    print(f" {'Операция':<18}{'оп/с':>10}{'p50 мс':>10}{'p95 мс':>10}{'p99 мс':>10}{'запросов':>10}{'ошибок':>8}")
+    for operation, row in results["operations"].items():
+        line = (
+            f" {operation:<18}{row['ops_per_second']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+            f"{row['p99_ms']:>10.2f}{row['queries_per_op']:>10.1f}{row['errors']:>8}"
+        )
+        if baseline and operation in baseline["operations"]:
+            before = baseline["operations"][operation]
+            line += _change(row, before, "ops_per_second", "оп/с") + _change(row, before, "p95_ms", "p95")
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест ShopService.")
+    parser.add_argument("--dsn", default="sqlite:///bench.db")
+    parser.add_argument("--users", type=int, default=4, help="количество одновременных пользователей")
+    parser.add_argument("--iterations", type=int, default=100, help="циклов операций на пользователя")
+    parser.add_argument("--seed-products", type=int, default=1000)
+    parser.add_argument("--seed-tickets", type=int, default=10000)
+    parser.add_argument("--seed-orders", type=int, default=10000)
+    parser.add_argument("--save", help="сохранить результаты в JSON-файл")
+    parser.add_argument("--compare", help="сравнить с результатами из JSON-файла")
+    args = parser.parse_args()
+
+    session.init_engine(args.dsn)
+    ticket_codes = seed(args.users, args.seed_products, args.seed_tickets, args.seed_orders)
+    bench_results = run(args.users, args.iterations, ticket_codes, args.seed_products)
+
+    baseline_results = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline_results = json.load(file)
+    report(bench_results, baseline_results)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(bench_results, file, indent=2)
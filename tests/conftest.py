@@ -0,0 +1,21 @@
+import pytest
+
+from application.db import session
+from application.models import Product, User
+
+
+@pytest.fixture
+def db(tmp_path):
+    """
+    База данных SQLite во временном каталоге с созданными таблицами.
+    """
+    session.init_engine(f"sqlite:///{tmp_path / 'shop.db'}")
+    session.create_tables()
+    Product.invalidate_catalog(names=True)
+    yield tmp_path / "shop.db"
+    session.engine.dispose()
+
+
+@pytest.fixture
+def buyer(db):
+    return User.create(username="buyer", password="12345678", points=100)
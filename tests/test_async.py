@@ -0,0 +1,84 @@
+import asyncio
+
+from application.async_service import AsyncShopService
+from application.auth import needs_rehash, verify_password
+from application.db import async_session
+from application.models import Orders, Product, PurchaseError, Ticket, User
+from application.storage import MemoryStorage
+
+
+def run(db, coroutine_function):
+    """
+    Выполняет сценарий `coroutine_function()` на асинхронном механизме той же базы данных SQLite.
+    """
+    async def scenario():
+        async_session.init_engine(f"sqlite+aiosqlite:///{db}")
+        try:
+            return await coroutine_function()
+        finally:
+            await async_session.dispose()
+
+    return asyncio.run(scenario())
+
+
+def test_service_register_ticket_buy_profile(db):
+    product = Product.create(name="Чай", cost=15, count=3)
+    code = next(Ticket.mint(1))
+    service = AsyncShopService(MemoryStorage())
+
+    async def scenario():
+        assert await service.register("async", "12345678") is not None
+        assert await service.login("async", "wrong-password") is None
+        assert await service.submit_ticket(code)
+        assert not await service.submit_ticket(code)
+        assert await service.buy_product(product.id) == "Чай"
+        return await service.profile()
+
+    history = run(db, scenario)
+
+    assert [(o.product_name, o.cost) for o in history] == [("Чай", 15)]
+    assert User.get_row(username="async").points == Ticket.POINTS - 15
+    assert Product.get_row(id=product.id).count == 2
+
+
+def test_concurrent_purchases_do_not_oversell(db):
+    product = Product.create(name="Последний", cost=1, count=1)
+    users = [User.create(username=f"u{i}", password="12345678", points=10) for i in range(5)]
+
+    async def scenario():
+        return await asyncio.gather(
+            *(Orders.apurchase(user_id=user.id, product_id=product.id) for user in users),
+            return_exceptions=True,
+        )
+
+    results = run(db, scenario)
+
+    assert sum(isinstance(result, tuple) for result in results) == 1
+    assert sum(isinstance(result, PurchaseError) for result in results) == 4
+    assert Product.get_row(id=product.id).count == 0
+
+
+def test_async_reads(db):
+    Product.create(name="a", cost=1, count=1)
+    Product.create(name="b", cost=2, count=0)
+
+    async def scenario():
+        return await Product.afind_rows(limit=None), await Product.aget(name="b")
+
+    rows, product = run(db, scenario)
+
+    assert [row.name for row in rows] == ["a", "b"]
+    assert product.cost == 2
+
+
+def test_login_rehashes_legacy_plaintext_password(db, buyer):
+    service = AsyncShopService(MemoryStorage())
+
+    async def scenario():
+        assert await service.login("buyer", "wrong-password") is None
+        return await service.login("buyer", "12345678")
+
+    assert run(db, scenario).id == buyer.id
+    stored = User.get(id=buyer.id).password
+    assert not needs_rehash(stored)
+    assert verify_password("12345678", stored)
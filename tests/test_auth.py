@@ -0,0 +1,61 @@
+import time
+
+from application.auth import TokenCache, hash_password, needs_rehash, verify_password
+from application.dto import UserRow
+from application.models import User
+from application.storage import MemoryStorage
+
+
+def test_hash_password_is_salted_and_verifiable():
+    first, second = hash_password("12345678"), hash_password("12345678")
+
+    assert first != second
+    assert not needs_rehash(first)
+    assert verify_password("12345678", first) and verify_password("12345678", second)
+    assert not verify_password("87654321", first)
+    assert not verify_password("12345678", None)
+
+
+def test_register_stores_only_the_hash(db):
+    user = User.register(username="sveta", password="12345678")
+
+    assert User.get(username="sveta").password != "12345678"
+    assert User.authenticate(username="sveta", password="12345678").id == user.id
+    assert User.authenticate(username="sveta", password="wrong-password") is None
+
+
+def test_legacy_plaintext_password_is_rehashed_on_login(buyer):
+    assert User.get(id=buyer.id).password == "12345678"
+
+    assert not User.get(id=buyer.id).check_password("wrong-password")
+    assert User.get(id=buyer.id).password == "12345678"
+
+    assert User.get(id=buyer.id).check_password("12345678")
+    stored = User.get(id=buyer.id).password
+    assert not needs_rehash(stored)
+    assert verify_password("12345678", stored)
+
+
+def test_token_cache_returns_user_until_expiry(monkeypatch):
+    storage = MemoryStorage()
+    tokens = TokenCache(storage, ttl=60)
+    token = tokens.issue(UserRow(id=1, username="sveta", points=20))
+
+    assert tokens.get(token) == {"id": 1, "username": "sveta", "points": 20}
+    assert tokens.get("unknown") is None
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert tokens.get(token) is None
+    # Просроченный токен удаляется из хранилища.
+    assert storage.get(f"token:{token}") is None
+
+
+def test_token_cache_revoke():
+    tokens = TokenCache(MemoryStorage(), user_fields=("id",))
+    token = tokens.issue(UserRow(id=1, username="sveta", points=20))
+
+    assert tokens.get(token) == {"id": 1}
+    tokens.revoke(token)
+    tokens.revoke(token)
+    assert tokens.get(token) is None
@@ -0,0 +1,70 @@
+import pytest
+
+from application.bulk import export_records, import_records, read_records
+from application.models import Product, Ticket
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_export_import_round_trip_with_upsert(db, tmp_path, suffix):
+    tea = Product.create(name="Чай", cost=10, count=5)
+    coffee = Product.create(name="Кофе", cost=20, count=0)
+    file_name = str(tmp_path / f"products{suffix}")
+
+    assert export_records(Product, file_name, batch_size=1) == 2
+
+    # Повторный импорт выгрузки обновляет товары по названию, не создавая дубликатов и не меняя идентификаторы.
+    tea.update(cost=99)
+    assert import_records(Product, read_records(file_name), chunk_size=1) == 2
+    assert [(p.id, p.name, p.cost, p.count) for p in Product.find_rows()] == [
+        (tea.id, "Чай", 10, 5),
+        (coffee.id, "Кофе", 20, 0),
+    ]
+
+
+def test_import_converts_csv_values_and_keeps_last_duplicate(db, tmp_path):
+    file_name = tmp_path / "tickets.csv"
+    file_name.write_text("id,uuid,available,user\n7,a,true,\n8,b,0,\n9,a,false,\n", encoding="utf-8")
+
+    assert import_records(Ticket, read_records(str(file_name)), chunk_size=10) == 3
+
+    tickets = {t.uuid: t for t in Ticket.find_rows()}
+    assert set(tickets) == {"a", "b"}
+    # Первичный ключ из файла не загружается, а для повторяющегося ключа остается последняя запись пачки.
+    assert 7 not in {t.id for t in tickets.values()}
+    assert (tickets["a"].available, tickets["b"].available, tickets["a"].user) == (False, False, None)
+
+
+def test_import_refreshes_catalog(db, tmp_path):
+    version = Product.catalog_version()
+    file_name = tmp_path / "products.jsonl"
+    file_name.write_text('{"name": "Чай", "cost": 10, "count": 1}\n\n', encoding="utf-8")
+
+    import_records(Product, read_records(str(file_name)))
+
+    assert Product.catalog_version() != version
+    assert [p.name for p in Product.search(text="ча")] == ["Чай"]
+
+
+def test_records_with_different_columns_keep_their_values(db):
+    Product.create(name="Чай", cost=10, count=5)
+    records = [
+        {"name": "Кофе", "cost": 5},
+        {"name": "Какао", "cost": 2, "count": 3},
+        # Запись только с ключом не меняет существующий товар.
+        {"name": "Чай"},
+    ]
+
+    assert import_records(Product, records) == 3
+
+    assert [(p.name, p.cost, p.count) for p in Product.find_rows()] == [
+        ("Чай", 10, 5),
+        ("Кофе", 5, None),
+        ("Какао", 2, 3),
+    ]
+
+
+def test_unknown_column_names_the_record(db):
+    records = [{"name": "Чай", "cost": 10}, {"name": "Кофе", "bogus": 1}]
+
+    with pytest.raises(ValueError, match="Запись 2: неизвестная колонка 'bogus'"):
+        import_records(Product, records)
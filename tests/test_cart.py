@@ -0,0 +1,36 @@
+import pytest
+
+from application.models import OrderHistory, Orders, Product, PurchaseError, User, UserOrderStats
+
+
+def test_checkout_buys_all_items_in_one_transaction(buyer):
+    tea = Product.create(name="Чай", cost=10, count=5)
+    coffee = Product.create(name="Кофе", cost=20, count=5)
+
+    bought, points = Orders.checkout(user_id=buyer.id, items={coffee.id: 2, tea.id: 3})
+
+    assert bought == [("Чай", 3), ("Кофе", 2)]
+    assert points == 30
+    assert [Product.get_row(id=p.id).count for p in (tea, coffee)] == [2, 3]
+    assert UserOrderStats.get(user_id=buyer.id).total_spent == 70
+
+
+@pytest.mark.parametrize(
+    "items, error",
+    [
+        ({1: 1, 2: 6}, "закончился"),
+        ({1: 1, 404: 1}, "не существует"),
+        ({1: 5, 2: 5}, "недостаточно"),
+        ({1: 0}, "пуста"),
+    ],
+)
+def test_checkout_changes_nothing_on_error(buyer, items, error):
+    Product.create(name="Чай", cost=10, count=5)
+    Product.create(name="Кофе", cost=20, count=5)
+
+    with pytest.raises(PurchaseError, match=error):
+        Orders.checkout(user_id=buyer.id, items=items)
+
+    assert [p.count for p in Product.find_rows()] == [5, 5]
+    assert User.get_row(id=buyer.id).points == 100
+    assert OrderHistory.for_user(buyer.id) == []
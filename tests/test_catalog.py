@@ -0,0 +1,49 @@
+import multiprocessing
+
+import pytest
+
+from application.catalog import CatalogCache
+from application.db import session
+from application.models import Orders, Product
+from application.storage import MemoryStorage, SharedMemoryStorage
+
+
+@pytest.fixture
+def shared_catalog(tmp_path):
+    storage = SharedMemoryStorage(str(tmp_path / "catalog.shm"), slots=16, slot_size=128)
+    Product.use_catalog_storage(storage)
+    yield storage
+    Product.use_catalog_storage(MemoryStorage())
+    storage.close()
+
+
+def test_reads_hit_the_cache_until_the_catalog_changes(buyer):
+    tea = Product.create(name="Чай", cost=5, count=2)
+    cache = CatalogCache()
+
+    assert cache.product(tea.id).count == 2
+    assert cache.product(tea.id).count == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    Orders.purchase(user_id=buyer.id, product_id=tea.id)
+
+    assert cache.product(tea.id).count == 1
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def _purchase_in_child(db, user_id: int, product_id: int) -> None:
+    session.init_engine(f"sqlite:///{db}")
+    Orders.purchase(user_id=user_id, product_id=product_id)
+
+
+def test_purchase_in_another_process_invalidates_the_cache(db, buyer, shared_catalog):
+    tea = Product.create(name="Чай", cost=5, count=2)
+    cache = CatalogCache()
+    assert cache.product(tea.id).count == 2
+
+    child = multiprocessing.get_context("fork").Process(target=_purchase_in_child, args=(db, buyer.id, tea.id))
+    child.start()
+    child.join()
+
+    assert child.exitcode == 0
+    assert cache.product(tea.id).count == 1
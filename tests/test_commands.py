@@ -0,0 +1,67 @@
+import json
+
+from application.commands import ShopCommands, run_batch
+from application.db.base import _scoped_session
+from application.models import Orders, Product, Ticket, User
+
+
+def test_execute_validates_arguments(buyer):
+    commands = ShopCommands()
+
+    assert commands.execute("nope")["error"] == "Неизвестная операция: nope"
+    assert commands.execute("buy", {"product_id": 1})["error"] == "Необходимо войти в систему"
+    assert commands.execute("login", {"username": "buyer"})["error"].startswith("Неверные аргументы")
+    assert commands.execute("list_products", {"limit": "x"})["error"].startswith("Неверные аргументы")
+    assert commands.execute("list_products", ["limit"])["error"].startswith("Неверные аргументы")
+    assert commands.execute("list_products", {"limit": "1"}) == {"ok": True, "products": []}
+
+
+def test_run_batch_executes_commands_in_order(buyer):
+    tea = Product.create(name="Чай", cost=30, count=5)
+    (ticket,) = Ticket.mint(1)
+    lines = [
+        json.dumps({"op": "login", "args": {"username": "buyer", "password": "12345678"}}),
+        "",
+        json.dumps({"op": "buy", "args": {"product_id": tea.id}}),
+        json.dumps({"op": "redeem_ticket", "args": {"ticket": ticket}}),
+        "{not json",
+        json.dumps(["buy"]),
+        json.dumps({"args": {}}),
+        json.dumps({"op": "profile"}),
+    ]
+
+    results = list(run_batch(ShopCommands(), lines, chunk_size=2))
+
+    assert [result["ok"] for result in results] == [True, True, True, False, False, False, True]
+    assert results[2]["points"] == 100 - 30 + Ticket.POINTS
+    assert all(result["error"].startswith("Неверная команда") for result in results[3:6])
+    assert [order["product"] for order in results[6]["orders"]] == ["Чай"]
+
+
+def test_run_batch_yields_outside_the_batch_session(buyer):
+    lines = [json.dumps({"op": "list_products"})] * 3
+    batch = run_batch(ShopCommands(), lines, chunk_size=2)
+
+    for _ in batch:
+        assert _scoped_session.get() is None
+
+
+def test_error_inside_an_operation_rolls_back(buyer, monkeypatch):
+    tea = Product.create(name="Чай", cost=30, count=5)
+    purchase = Orders._purchase
+
+    def failing_purchase(conn, user_id, product_id):
+        purchase(conn, user_id, product_id)
+        raise RuntimeError("сбой после покупки")
+
+    monkeypatch.setattr(Orders, "_purchase", failing_purchase)
+    lines = [
+        json.dumps({"op": "login", "args": {"username": "buyer", "password": "12345678"}}),
+        json.dumps({"op": "buy", "args": {"product_id": tea.id}}),
+    ]
+
+    results = list(run_batch(ShopCommands(), lines))
+
+    assert results[1] == {"ok": False, "error": "сбой после покупки"}
+    assert Product.get_row(id=tea.id).count == 5
+    assert User.get_row(id=buyer.id).points == 100
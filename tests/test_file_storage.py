@@ -0,0 +1,71 @@
+import os
+
+from application.storage import FileStorage
+
+
+def test_values_survive_reopen(tmp_path):
+    file_name = str(tmp_path / "kv.log")
+    storage = FileStorage(file_name)
+    storage.set("a", {"x": 1})
+    storage.set("b", [1, 2])
+    storage.set("a", {"x": 2})
+    storage.delete("b")
+    storage.close()
+
+    storage = FileStorage(file_name)
+    assert storage.get("a") == {"x": 2}
+    assert storage.get("b") is None
+
+
+def test_torn_tail_is_discarded(tmp_path):
+    file_name = str(tmp_path / "kv.log")
+    storage = FileStorage(file_name)
+    storage.set("a", 1)
+    storage.close()
+    size = os.path.getsize(file_name)
+    # Процесс упал, не дописав строку.
+    with open(file_name, "ab") as file:
+        file.write(b'{"k": "b", "v"')
+
+    storage = FileStorage(file_name)
+    assert storage.get("a") == 1
+    assert storage.get("b") is None
+    assert os.path.getsize(file_name) == size
+
+    storage.set("b", 2)
+    storage.close()
+    assert FileStorage(file_name).get("b") == 2
+
+
+def test_compaction_keeps_only_current_values(tmp_path):
+    file_name = str(tmp_path / "kv.log")
+    storage = FileStorage(file_name, compact_threshold=10)
+    for i in range(100):
+        storage.set(f"key{i % 3}", i)
+    storage.set("gone", 1)
+    storage.delete("gone")
+    storage.compact()
+
+    with open(file_name, "rb") as file:
+        assert len(file.readlines()) == 3
+    assert [storage.get(f"key{i}") for i in range(3)] == [99, 97, 98]
+    assert storage.get("gone") is None
+
+
+def test_instances_see_each_others_writes_and_compaction(tmp_path):
+    file_name = str(tmp_path / "kv.log")
+    first = FileStorage(file_name, compact_threshold=5)
+    second = FileStorage(file_name, compact_threshold=5)
+
+    first.set("a", 1)
+    second.set("b", 2)
+    assert first.get("b") == 2
+    assert second.get("a") == 1
+
+    # Сжатие в одном экземпляре заменяет файл, второй экземпляр продолжает работать с новым файлом.
+    for i in range(10):
+        first.set("a", i)
+    second.set("c", 3)
+    assert first.get("c") == 3
+    assert second.get("a") == 9
+    assert FileStorage(file_name).get("b") == 2
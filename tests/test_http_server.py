@@ -0,0 +1,59 @@
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from application.http_server import ShopHTTPServer, TOKEN_TTL, _shared_storage
+from application.models import Product
+
+
+@pytest.fixture
+def server(db, tmp_path):
+    # Токены хранятся в общем хранилище процессов, как при `--processes > 1`.
+    storage = _shared_storage(str(tmp_path / "tokens.shm"), slot_size=256, ttl=TOKEN_TTL)
+    server = ShopHTTPServer(("127.0.0.1", 0), storage=storage, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    storage.close()
+
+
+def call(server, method: str, path: str, body: dict = None, token: str = None) -> tuple[int, dict]:
+    request = Request(
+        f"http://127.0.0.1:{server.server_address[1]}{path}",
+        data=json.dumps(body).encode() if body is not None else None,
+        method=method,
+    )
+    if token is not None:
+        request.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_long_username_gets_a_token(server):
+    credentials = {"username": "Ё" * 60, "password": "12345678"}
+
+    status, registered = call(server, "POST", "/register", credentials)
+    assert status == 200 and registered["token"]
+
+    status, logged_in = call(server, "POST", "/login", credentials, token=registered["token"])
+    assert status == 200 and logged_in["token"] != registered["token"]
+
+    status, profile = call(server, "GET", "/profile", token=logged_in["token"])
+    assert (status, profile["username"]) == (200, credentials["username"])
+
+    # Повторный вход отозвал прежний токен.
+    assert call(server, "GET", "/profile", token=registered["token"])[0] == 401
+
+
+def test_purchase_requires_a_token(server):
+    product = Product.create(name="Чай", cost=0, count=1)
+
+    assert call(server, "POST", "/purchase", {"product_id": product.id})[0] == 401
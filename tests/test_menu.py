@@ -0,0 +1,42 @@
+from application.dto import UserRow
+from application.menu import UserMenu
+from application.storage import MemoryStorage
+
+
+def make_menu(calls: list) -> tuple[UserMenu, MemoryStorage]:
+    storage = MemoryStorage()
+    menu = UserMenu(storage=storage, admin_usernames={"admin"})
+    for name, level in (("Товары", 0), ("Войти", 1), ("Профиль", 2), ("Отчеты", 3)):
+        menu.add_menu_category(name=name, callback=lambda name=name: calls.append(name), login_required=level)
+    return menu, storage
+
+
+def test_categories_depend_on_the_current_user(capsys):
+    menu, storage = make_menu([])
+
+    menu.display_categories()
+    storage.set(name="user", item=UserRow(1, "buyer", 0))
+    menu.display_categories()
+    storage.set(name="user", item=UserRow(2, "admin", 0))
+    menu.display_categories()
+
+    assert capsys.readouterr().out.splitlines() == [
+        " 1. Товары", " 2. Войти",
+        " 1. Товары", " 3. Профиль",
+        " 1. Товары", " 3. Профиль", " 4. Отчеты",
+    ]
+
+
+def test_hidden_category_cannot_be_chosen_by_number(monkeypatch):
+    calls = []
+    menu, storage = make_menu(calls)
+    monkeypatch.setattr("builtins.input", lambda prompt="": "4")
+
+    menu.handler()
+    storage.set(name="user", item=UserRow(1, "buyer", 0))
+    menu.handler()
+    assert calls == []
+
+    storage.set(name="user", item=UserRow(2, "admin", 0))
+    menu.handler()
+    assert calls == ["Отчеты"]
@@ -0,0 +1,82 @@
+import asyncio
+
+from sqlalchemy import create_engine, text
+
+from application.metrics import Histogram, Metrics
+
+
+def test_percentile():
+    histogram = Histogram(max_samples=100)
+    assert histogram.percentile(0.5) == 0.0
+
+    for value in range(1, 101):
+        histogram.observe(value)
+
+    assert (histogram.percentile(0.5), histogram.percentile(0.95), histogram.percentile(0.99)) == (51, 96, 100)
+    assert (histogram.count, histogram.total) == (100, 5050)
+
+
+def test_percentile_uses_only_the_latest_samples():
+    histogram = Histogram(max_samples=10)
+    for value in range(100):
+        histogram.observe(value)
+
+    assert histogram.percentile(0.0) == 90
+    assert histogram.count == 100
+
+
+def test_queries_are_attributed_to_the_current_action():
+    metrics = Metrics()
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+
+    with engine.connect() as conn:
+        with metrics.action("Купить"):
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        conn.execute(text("SELECT 3"))
+
+    assert metrics.counter("db_queries_total", action="Купить") == 2
+    assert metrics.counter("db_queries_total", action="-") == 1
+    assert metrics.histogram("db_query_seconds", action="Купить").count == 2
+    assert metrics.histogram("action_seconds", action="Купить").count == 1
+
+
+def test_timed_measures_sync_and_async_methods():
+    metrics = Metrics()
+
+    class Model:
+        @classmethod
+        @metrics.timed
+        def find(cls):
+            return "find"
+
+        @metrics.timed
+        async def afind(self):
+            await asyncio.sleep(0.01)
+            return "afind"
+
+    assert Model.find() == "find"
+    assert asyncio.run(Model().afind()) == "afind"
+
+    assert metrics.histogram("model_method_seconds", method="Model.find").count == 1
+    histogram = metrics.histogram("model_method_seconds", method="Model.afind")
+    # Время асинхронного метода включает ожидание, а не только создание корутины.
+    assert histogram.count == 1 and histogram.total >= 0.01
+
+
+def test_prometheus_format_and_label_escaping():
+    metrics = Metrics()
+    metrics.observe("action_seconds", 0.5, action='Купить "чай"\\\nсейчас')
+    metrics.inc("db_queries_total", 3, action="-")
+
+    assert metrics.to_prometheus().splitlines() == [
+        "# TYPE action_seconds summary",
+        'action_seconds{action="Купить \\"чай\\"\\\\\\nсейчас",quantile="0.5"} 0.5',
+        'action_seconds{action="Купить \\"чай\\"\\\\\\nсейчас",quantile="0.95"} 0.5',
+        'action_seconds{action="Купить \\"чай\\"\\\\\\nсейчас",quantile="0.99"} 0.5',
+        'action_seconds_sum{action="Купить \\"чай\\"\\\\\\nсейчас"} 0.5',
+        'action_seconds_count{action="Купить \\"чай\\"\\\\\\nсейчас"} 1',
+        "# TYPE db_queries_total counter",
+        'db_queries_total{action="-"} 3',
+    ]
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from application.db import BaseModel, session
+from application.models import OrderHistory, Orders, Product, User, UserOrderStats
+
+
+def test_create_tables_backfills_existing_orders(tmp_path):
+    session.init_engine(f"sqlite:///{tmp_path / 'shop.db'}")
+    # База данных до появления истории заказов: заказы уже есть, а таблиц истории и итогов еще нет.
+    projection = {OrderHistory.__table__, UserOrderStats.__table__}
+    BaseModel.metadata.create_all(
+        bind=session.engine, tables=[t for t in BaseModel.metadata.sorted_tables if t not in projection],
+    )
+    with session.begin() as conn:
+        conn.execute(insert(User).values(id=1, username="old", password="12345678", points=0))
+        conn.execute(insert(Product).values(id=1, name="Чай", cost=5, count=10))
+        conn.execute(
+            insert(Orders).values(
+                [{"user_id": 1, "product_id": 1, "count": count, "order_datetime": datetime.now()} for count in (1, 3)]
+            )
+        )
+
+    try:
+        session.create_tables()
+
+        assert [(o.product_name, o.count, o.cost) for o in OrderHistory.for_user(1)] == [("Чай", 1, 5), ("Чай", 3, 15)]
+        stats = UserOrderStats.get(user_id=1)
+        assert (stats.orders_count, stats.total_spent) == (2, 20)
+    finally:
+        session.engine.dispose()
+
+
+def test_orders_create_records_history(buyer):
+    tea = Product.create(name="Чай", cost=5, count=10)
+
+    order = Orders.create(user_id=buyer.id, product_id=tea.id, count=2, order_datetime=datetime.now())
+
+    assert [(o.order_id, o.count, o.cost) for o in OrderHistory.for_user(buyer.id)] == [(order.id, 2, 10)]
+    assert UserOrderStats.get(user_id=buyer.id).total_spent == 10
+
+
+def test_rebuild_matches_incremental_history(buyer):
+    tea = Product.create(name="Чай", cost=5, count=10)
+    coffee = Product.create(name="Кофе", cost=7, count=10)
+    Orders.purchase(user_id=buyer.id, product_id=tea.id)
+    Orders.checkout(user_id=buyer.id, items={tea.id: 2, coffee.id: 1})
+    history = OrderHistory.for_user(buyer.id)
+
+    OrderHistory.rebuild()
+
+    assert [(o.order_id, o.product_name, o.count, o.cost) for o in OrderHistory.for_user(buyer.id)] == [
+        (o.order_id, o.product_name, o.count, o.cost) for o in history
+    ]
+    stats = UserOrderStats.get(user_id=buyer.id)
+    assert (stats.orders_count, stats.total_spent) == (3, 22)
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+
+from application.metrics import metrics
+from application.models import OrderHistory, Orders, Product, PurchaseError, User, UserOrderStats
+
+
+def test_purchase_updates_product_user_and_history(buyer):
+    product = Product.create(name="Чай", cost=30, count=2)
+
+    name, points = Orders.purchase(user_id=buyer.id, product_id=product.id)
+
+    assert (name, points) == ("Чай", 70)
+    assert Product.get_row(id=product.id).count == 1
+    assert User.get_row(id=buyer.id).points == 70
+    assert [(o.product_name, o.count, o.cost) for o in OrderHistory.for_user(buyer.id)] == [("Чай", 1, 30)]
+    stats = UserOrderStats.get(user_id=buyer.id)
+    assert (stats.orders_count, stats.total_spent) == (1, 30)
+
+
+def test_purchase_of_last_unit_succeeds_once(buyer):
+    product = Product.create(name="Чай", cost=10, count=1)
+
+    Orders.purchase(user_id=buyer.id, product_id=product.id)
+    with pytest.raises(PurchaseError, match="закончился"):
+        Orders.purchase(user_id=buyer.id, product_id=product.id)
+
+    assert Product.get_row(id=product.id).count == 0
+    assert User.get_row(id=buyer.id).points == 90
+
+
+def test_purchase_without_points_rolls_back_product_count(buyer):
+    product = Product.create(name="Кофе", cost=500, count=3)
+
+    with pytest.raises(PurchaseError, match="недостаточно"):
+        Orders.purchase(user_id=buyer.id, product_id=product.id)
+
+    assert Product.get_row(id=product.id).count == 3
+    assert User.get_row(id=buyer.id).points == 100
+    assert OrderHistory.for_user(buyer.id) == []
+
+
+def test_purchase_of_unknown_product(buyer):
+    with pytest.raises(PurchaseError, match="не существует"):
+        Orders.purchase(user_id=buyer.id, product_id=404)
+
+
+@pytest.mark.parametrize("orders", [1, 25])
+def test_filter_with_related_runs_constant_number_of_queries(buyer, orders):
+    products = [Product.create(name=f"Товар {i}", cost=1, count=1) for i in range(orders)]
+    for product in products:
+        Orders.create(user_id=buyer.id, product_id=product.id, count=1, order_datetime=datetime.now())
+
+    queries = metrics.counter("db_queries_total", action="with_related")
+    with metrics.action("with_related"):
+        loaded = Orders.filter(user_id=buyer.id, with_related=("product",))
+
+    # Заказы и все их товары загружаются двумя запросами, а после закрытия сеанса товары уже доступны.
+    assert metrics.counter("db_queries_total", action="with_related") - queries == 2
+    assert sorted(order.product.name for order in loaded) == sorted(product.name for product in products)
@@ -0,0 +1,42 @@
+from application.metrics import metrics
+from application.models import Product
+
+
+def test_page_walks_the_table_by_id(db):
+    ids = [Product.create(name=f"Товар {i}", cost=i, count=1).id for i in range(7)]
+
+    pages, after_id = [], 0
+    while True:
+        page = Product.page(after_id=after_id, limit=3)
+        pages.append([product.id for product in page])
+        if len(page) < 3:
+            break
+        after_id = page[-1].id
+
+    assert pages == [ids[:3], ids[3:6], ids[6:]]
+    assert [p.name for p in Product.page(after_id=ids[0], limit=2, cost=4)] == ["Товар 4"]
+
+
+def test_page_is_timed_once(db):
+    before = metrics.histogram("model_method_seconds", method="Product.find")
+    before = before.count if before is not None else 0
+
+    Product.page(limit=1)
+
+    assert metrics.histogram("model_method_seconds", method="Product.page") is None
+    assert metrics.histogram("model_method_seconds", method="Product.find").count == before + 1
+
+
+def test_iter_all_streams_every_row_in_batches(db):
+    names = [f"Товар {i}" for i in range(5)]
+    for name in names:
+        Product.create(name=name, cost=1, count=1)
+
+    queries = metrics.counter("db_queries_total", action="iter_all")
+    with metrics.action("iter_all"):
+        rows = Product.iter_all(batch_size=2)
+        assert next(rows).name == names[0]
+        assert [product.name for product in rows] == names[1:]
+
+    # Пачки читаются из одного серверного курсора, а не отдельными запросами.
+    assert metrics.counter("db_queries_total", action="iter_all") - queries == 1
@@ -0,0 +1,109 @@
+import multiprocessing
+import shutil
+import sqlite3
+import time
+
+import pytest
+
+from application.catalog import CatalogCache
+from application.db import session
+from application.models import OrderHistory, Orders, Product
+from application.storage import SharedMemoryStorage
+
+
+def init_engine(db, replica, **kwargs) -> None:
+    session.init_engine(f"sqlite:///{db}", replicas=[f"sqlite:///{replica}"], **kwargs)
+
+
+@pytest.fixture
+def tea(db, buyer, tmp_path):
+    """
+    Товар на основной базе данных и реплика — копия файла базы данных, которая больше не обновляется.
+    """
+    product = Product.create(name="Чай", cost=30, count=5)
+    shutil.copy(db, tmp_path / "replica.db")
+    init_engine(db, tmp_path / "replica.db", read_your_writes=60)
+    return product
+
+
+def test_reads_go_to_the_replica(buyer, tea):
+    with session.begin() as conn:
+        conn.get(Product, tea.id).count = 1
+
+    assert Product.get_row(id=tea.id).count == 5
+    # Внутри `scope()` все запросы выполняются на основной базе данных.
+    with session.scope():
+        assert Product.get_row(id=tea.id).count == 1
+
+
+def test_buyer_reads_own_purchase_from_the_primary(buyer, tea):
+    Orders.purchase(user_id=buyer.id, product_id=tea.id)
+
+    with session.reader(buyer.id):
+        assert Product.get_row(id=tea.id).count == 4
+        assert [o.product_name for o in OrderHistory.for_user(buyer.id)] == ["Чай"]
+    with session.reader("someone else"):
+        assert Product.get_row(id=tea.id).count == 5
+    assert OrderHistory.for_user(buyer.id) == []
+
+    # Кэш каталога после изменения загружает товары с основной базы данных.
+    assert CatalogCache().product(tea.id).count == 4
+
+
+def test_pin_expires(db, buyer, tea, tmp_path):
+    init_engine(db, tmp_path / "replica.db", read_your_writes=0.05)
+    Orders.purchase(user_id=buyer.id, product_id=tea.id)
+
+    with session.reader(buyer.id):
+        assert Product.get_row(id=tea.id).count == 4
+        time.sleep(0.1)
+        assert Product.get_row(id=tea.id).count == 5
+
+
+def _replicate(db, replica) -> None:
+    """
+    Реплика получает все изменения основной базы данных. Названия товаров на ней помечаются, чтобы было видно,
+    откуда прочитан каталог.
+    """
+    shutil.copy(db, replica)
+    with sqlite3.connect(replica) as conn:
+        conn.execute("UPDATE products SET name = name || ' (реплика)'")
+    conn.close()
+
+
+def test_catalog_reads_reach_the_replica_while_purchases_continue(db, buyer, tea, tmp_path):
+    catalog = CatalogCache()
+
+    for count in (4, 3, 2):
+        Orders.purchase(user_id=buyer.id, product_id=tea.id)
+        # Пока на реплике нет нового заказа, промах кэша читает основную базу данных.
+        product = catalog.product(tea.id)
+        assert (product.name, product.count) == ("Чай", count)
+
+        # Реплика, получившая заказ, обслуживает промахи кэша, хотя отметка основной базы данных еще действует.
+        _replicate(db, tmp_path / "replica.db")
+        assert [(p.name, p.count) for p in catalog.page()] == [("Чай (реплика)", count)]
+
+
+def _pin_in_child(db, replica, pins_file: str, user_id: int) -> None:
+    init_engine(db, replica, read_your_writes=60, pins=SharedMemoryStorage(pins_file, slots=64, slot_size=128, ttl=60))
+    session.pin_primary(user_id)
+
+
+def test_pins_are_shared_between_processes(db, buyer, tea, tmp_path):
+    pins_file = str(tmp_path / "pins.shm")
+    pins = SharedMemoryStorage(pins_file, slots=64, slot_size=128, ttl=60)
+    init_engine(db, tmp_path / "replica.db", read_your_writes=60, pins=pins)
+    with session.begin() as conn:
+        conn.get(Product, tea.id).count = 1
+
+    child = multiprocessing.get_context("fork").Process(
+        target=_pin_in_child, args=(db, tmp_path / "replica.db", pins_file, buyer.id),
+    )
+    child.start()
+    child.join()
+
+    assert child.exitcode == 0
+    with session.reader(buyer.id):
+        assert Product.get_row(id=tea.id).count == 1
+    pins.close()
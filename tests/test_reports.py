@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from application import reports
+from application.models import Orders, Product, RollupState, SalesRollup
+
+
+def _units() -> dict[int, int]:
+    units: dict[int, int] = {}
+    for row in SalesRollup.all():
+        units[row.product_id] = units.get(row.product_id, 0) + row.units
+    return units
+
+
+def _now() -> datetime:
+    # Заказы, оформленные до вызова, попадают в обновление без задержки `REFRESH_LAG`.
+    return datetime.now()
+
+
+def test_refresh_counts_each_order_once(buyer):
+    tea = Product.create(name="Чай", cost=5, count=10)
+    coffee = Product.create(name="Кофе", cost=7, count=10)
+    Orders.purchase(user_id=buyer.id, product_id=tea.id)
+    Orders.checkout(user_id=buyer.id, items={tea.id: 2, coffee.id: 1})
+
+    watermark = reports.refresh_rollup(until=_now())
+    assert _units() == {tea.id: 3, coffee.id: 1}
+
+    # Повторное обновление до той же отметки ничего не добавляет.
+    assert reports.refresh_rollup(until=watermark) == watermark
+    assert _units() == {tea.id: 3, coffee.id: 1}
+    assert RollupState.get(name=reports.ROLLUP_NAME).watermark == watermark
+
+
+def test_refresh_adds_only_orders_after_watermark(buyer):
+    tea = Product.create(name="Чай", cost=5, count=10)
+    Orders.purchase(user_id=buyer.id, product_id=tea.id)
+    reports.refresh_rollup(until=_now())
+
+    Orders.purchase(user_id=buyer.id, product_id=tea.id)
+    assert _units() == {tea.id: 1}
+    reports.refresh_rollup(until=_now())
+    assert _units() == {tea.id: 2}
+
+    revenue = sum(row.revenue for row in SalesRollup.all())
+    reports.rebuild_rollup()
+    reports.refresh_rollup(until=_now())
+    assert _units() == {tea.id: 2}
+    assert sum(row.revenue for row in SalesRollup.all()) == revenue == 10
+
+
+def test_orders_inside_refresh_lag_are_not_counted_yet(buyer):
+    tea = Product.create(name="Чай", cost=5, count=10)
+    Orders.purchase(user_id=buyer.id, product_id=tea.id)
+
+    reports.refresh_rollup()
+
+    assert _units() == {}
+
+
+def test_top_sellers(buyer):
+    tea = Product.create(name="Чай", cost=5, count=10)
+    coffee = Product.create(name="Кофе", cost=7, count=10)
+    Orders.checkout(user_id=buyer.id, items={tea.id: 1, coffee.id: 3})
+    reports.refresh_rollup(until=_now())
+
+    headers, rows = reports.run_report("top_sellers", days=1)
+
+    assert headers[0] == "ID"
+    assert [(row[1], row[2], row[3]) for row in rows] == [("Кофе", 3, 21), ("Чай", 1, 5)]
+
+
+def test_order_committed_late_is_still_counted(buyer):
+    tea = Product.create(name="Чай", cost=5, count=10)
+    reports.refresh_rollup()
+
+    # Заказ зафиксирован через минуту после своего `order_datetime`, уже после обновления агрегатов.
+    Orders.create(
+        user_id=buyer.id, product_id=tea.id, count=1, order_datetime=datetime.now() - timedelta(seconds=60),
+    )
+    reports.refresh_rollup(until=_now())
+
+    assert _units() == {tea.id: 1}
+
+
+def test_csv_export_is_written_to_the_reports_directory(buyer, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tea = Product.create(name="Чай", cost=5, count=10)
+    Orders.purchase(user_id=buyer.id, product_id=tea.id)
+    reports.refresh_rollup(until=_now())
+
+    assert reports.export_csv("top_sellers", "top.csv", days=1) == 1
+    assert (tmp_path / reports.REPORTS_DIR / "top.csv").read_text(encoding="utf-8").splitlines()[1].startswith(
+        f"{tea.id},Чай,1,5"
+    )
+
+    for file_name in ("../top.csv", "/tmp/top.csv", "sub/top.csv", "", ".."):
+        with pytest.raises(ValueError):
+            reports.export_csv("top_sellers", file_name)
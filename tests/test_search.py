@@ -0,0 +1,54 @@
+from sqlalchemy import inspect, text
+
+from application.db import session
+from application.models import Product
+from application.search import NameIndex
+
+
+def test_name_index_prefix_and_substring():
+    index = NameIndex([(1, "Чай черный"), (2, "Кофе"), (3, "чайник"), (4, "Молочный чай"), (5, None)])
+
+    assert len(index) == 4
+    assert index.prefix("ЧАЙ") == [1, 3]
+    assert index.prefix("я") == []
+    assert index.substring("чай") == [1, 3, 4]
+    assert index.substring("ай ") == [1]
+    # Строки короче трех символов проверяются без триграмм.
+    assert index.substring("оф") == [2]
+    assert index.substring("чаек") == []
+
+
+def test_search_checks_candidates_in_chunks(db, monkeypatch):
+    monkeypatch.setattr(Product, "SEARCH_CHUNK_SIZE", 2)
+    for number in range(1, 8):
+        Product.create(name=f"Чай {number}", cost=number * 10, count=number % 2)
+    Product.create(name="Кофе", cost=10, count=1)
+
+    assert [p.name for p in Product.search(text="чай", limit=3)] == ["Чай 1", "Чай 2", "Чай 3"]
+    assert [p.name for p in Product.search(text="чай", after_id=3, limit=3)] == ["Чай 4", "Чай 5", "Чай 6"]
+    assert [p.name for p in Product.search(text="ЧАЙ", prefix=True, in_stock=True, min_cost=20, rows=True)] == [
+        "Чай 3", "Чай 5", "Чай 7",
+    ]
+    assert [p.name for p in Product.search(max_cost=10)] == ["Чай 1", "Кофе"]
+    assert Product.search(text="чай", prefix=True, min_cost=100) == []
+
+
+def test_search_sees_renamed_products(db):
+    tea = Product.create(name="Чай", cost=10, count=1)
+    assert [p.id for p in Product.search(text="чай")] == [tea.id]
+
+    tea.update(name="Кофе")
+
+    assert Product.search(text="чай") == []
+    assert [p.id for p in Product.search(text="коф", prefix=True)] == [tea.id]
+
+
+def test_create_tables_adds_indexes_to_existing_tables(db):
+    with session.begin() as conn:
+        conn.execute(text("DROP INDEX ix_products_cost_id"))
+        conn.execute(text("DROP INDEX ix_products_in_stock_cost_id"))
+
+    session.create_tables()
+
+    indexes = {index["name"] for index in inspect(session.engine).get_indexes("products")}
+    assert {"ix_products_cost_id", "ix_products_in_stock_cost_id"} <= indexes
@@ -0,0 +1,109 @@
+import multiprocessing
+import struct
+import time
+
+import pytest
+
+from application.storage import SharedMemoryStorage
+
+
+@pytest.fixture
+def file_name(tmp_path):
+    return str(tmp_path / "shared.shm")
+
+
+@pytest.fixture
+def colliding(file_name, monkeypatch):
+    """
+    Хранилище, в котором все ключи имеют один хэш и занимают соседние слоты.
+    """
+    monkeypatch.setattr(SharedMemoryStorage, "_hash", staticmethod(lambda key: 1))
+    return SharedMemoryStorage(file_name, slots=8, slot_size=128, max_probes=4)
+
+
+def test_set_get_delete(file_name):
+    storage = SharedMemoryStorage(file_name, slots=64, slot_size=128)
+    storage.set("a", {"x": 1})
+    storage.set("a", {"x": 2})
+    storage.set("b", "значение")
+    storage.delete("b")
+
+    assert storage.get("a") == {"x": 2}
+    assert storage.get("b") is None
+    assert SharedMemoryStorage(file_name, slots=64, slot_size=128).get("a") == {"x": 2}
+
+
+def test_probing_skips_deleted_slots(colliding):
+    for key in "abc":
+        colliding.set(key, key)
+    colliding.delete("b")
+
+    assert colliding.get("c") == "c"
+    colliding.set("d", "d")
+    assert [colliding.get(key) for key in "abcd"] == ["a", None, "c", "d"]
+
+
+def test_full_probe_window_evicts_oldest(colliding):
+    for key in "abcd":
+        colliding.set(key, key)
+        time.sleep(0.001)
+    colliding.set("e", "e")
+
+    assert colliding.get("a") is None
+    assert [colliding.get(key) for key in "bcde"] == ["b", "c", "d", "e"]
+
+
+def test_many_keys_never_overflow(file_name):
+    storage = SharedMemoryStorage(file_name, slots=128, slot_size=64)
+    for i in range(1000):
+        storage.set(f"key{i}", i)
+    assert storage.get("key999") == 999
+
+
+def test_expired_values_are_missing(file_name):
+    storage = SharedMemoryStorage(file_name, slots=64, slot_size=128, ttl=0.05)
+    storage.set("a", 1)
+    assert storage.get("a") == 1
+    time.sleep(0.1)
+    assert storage.get("a") is None
+
+
+def test_rejects_bad_arguments(file_name):
+    storage = SharedMemoryStorage(file_name, slots=64, slot_size=64)
+    with pytest.raises(ValueError):
+        storage.set("", 1)
+    with pytest.raises(ValueError):
+        storage.set("big", "x" * 100)
+    with pytest.raises(ValueError):
+        SharedMemoryStorage(file_name, slots=128, slot_size=64)
+
+
+def test_slot_of_dead_writer_is_released(file_name):
+    storage = SharedMemoryStorage(file_name, slots=64, slot_size=128)
+    storage.set("a", 1)
+    slot, _, _ = storage._find(b"a", storage._hash(b"a"))
+    # Писатель сделал счетчик версии нечетным и завершился.
+    offset = storage._offset(slot)
+    struct.pack_into("<I", storage._mmap, offset, struct.unpack_from("<I", storage._mmap, offset)[0] + 1)
+
+    assert storage.get("a") is None
+    storage.set("a", 2)
+    assert storage.get("a") == 2
+
+
+def _write(file_name: str, count: int) -> None:
+    storage = SharedMemoryStorage(file_name, slots=64, slot_size=256)
+    for i in range(count):
+        storage.set("value", [i] * 20)
+
+
+def test_reader_never_sees_torn_value(file_name):
+    storage = SharedMemoryStorage(file_name, slots=64, slot_size=256)
+    storage.set("value", [0] * 20)
+    writer = multiprocessing.get_context("fork").Process(target=_write, args=(file_name, 20000))
+    writer.start()
+    while writer.is_alive():
+        value = storage.get("value")
+        assert len(set(value)) == 1
+    writer.join()
+    assert storage.get("value") == [19999] * 20
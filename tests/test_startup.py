@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import event, exc, text
+
+from application.db import session
+from application.models import Product
+from application.storage import MemoryStorage
+
+
+@pytest.fixture
+def warm_start(db):
+    """
+    Второй запуск с тем же отпечатком схемы: возвращает количество соединений, открытых при `create_tables`.
+    """
+    storage = MemoryStorage()
+    session.create_tables(storage=storage)
+    session.init_engine(f"sqlite:///{db}")
+
+    connections = []
+    event.listen(session.engine, "connect", lambda *args: connections.append(args))
+    session.create_tables(storage=storage)
+    return len(connections)
+
+
+def test_warm_start_opens_no_connection(warm_start):
+    assert warm_start == 0
+
+
+def test_missing_table_is_created_after_the_first_error(warm_start):
+    with session.begin() as conn:
+        conn.execute(text("DROP TABLE products"))
+
+    with pytest.raises(exc.OperationalError) as error:
+        Product.get_row(id=1)
+
+    assert session.recover_missing_tables(error.value)
+    assert Product.get_row(id=1) is None
+    # Таблицы создаются заново только один раз за запуск.
+    assert not session.recover_missing_tables(error.value)
+
+
+def test_missing_table_is_not_hidden_after_a_full_check(db):
+    session.create_tables(storage=MemoryStorage())
+    with session.begin() as conn:
+        conn.execute(text("DROP TABLE products"))
+
+    with pytest.raises(exc.OperationalError) as error:
+        Product.get_row(id=1)
+
+    assert not session.recover_missing_tables(error.value)
+    assert not session.recover_missing_tables(ValueError("no such table"))
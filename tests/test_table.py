@@ -0,0 +1,58 @@
+import io
+
+from application.models import Product
+from application.table import print_table
+
+
+def render(rows, headers, **kwargs) -> list[str]:
+    file = io.StringIO()
+    count = print_table(rows, headers=headers, file=file, **kwargs)
+    lines = file.getvalue().splitlines()
+    assert count == len(lines) - 2
+    return lines
+
+
+def test_widths_are_sampled_from_first_rows():
+    lines = render(iter([(1, "Чай"), (20, "Кофе"), (3, None)]), headers=["ID", "Название"])
+
+    assert lines == [
+        "ID  Название",
+        "--  --------",
+        " 1  Чай",
+        "20  Кофе",
+        " 3",
+    ]
+
+
+def test_text_beyond_the_sample_is_truncated_but_numbers_are_not():
+    rows = [(1, "Чай"), (123456, "Очень длинное название")]
+
+    lines = render(rows, headers=["ID", "Имя"], sample_size=1)
+
+    assert lines[:2] == ["ID  Имя", "--  ---"]
+    assert lines[2] == " 1  Чай"
+    assert lines[3] == "123456  Оч…"
+
+
+def test_given_widths_are_used_without_sampling():
+    rows = ((i, f"Товар {i}") for i in range(1, 1001))
+
+    lines = render(rows, headers=["ID", "Название"], widths=[4, 10], sample_size=1)
+
+    assert lines[:2] == ["  ID  Название", "----  ----------"]
+    assert lines[2] == "   1  Товар 1"
+    assert lines[-1] == "1000  Товар 1000"
+
+
+def test_widths_from_the_database_fit_every_row(db):
+    for name in ("Чай", "Кофе", "Очень длинное название"):
+        Product.create(name=name, cost=len(name) * 1000, count=1)
+
+    lines = render(
+        ((p.id, p.cost, p.name) for p in Product.iter_rows()),
+        headers=["ID", "Стоимость", "Название"],
+        widths=Product.max_lengths("id", "cost", "name"),
+        sample_size=1,
+    )
+
+    assert lines[-1] == " 3      22000  Очень длинное название"
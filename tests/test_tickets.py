@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy.exc import NoResultFound
+
+from application.models import Ticket, User
+
+
+def test_mint_creates_available_tickets(db):
+    codes = list(Ticket.mint(5, batch_size=2))
+
+    assert len(set(codes)) == 5
+    assert all(Ticket.is_valid(code) for code in codes)
+
+
+def test_redeem_credits_points_once(buyer):
+    (code,) = Ticket.mint(1)
+
+    assert Ticket.redeem(code, user_id=buyer.id) == 100 + Ticket.POINTS
+    assert Ticket.redeem(code, user_id=buyer.id) is None
+
+    assert User.get_row(id=buyer.id).points == 100 + Ticket.POINTS
+    ticket = Ticket.get_row(uuid=code)
+    assert (ticket.available, ticket.user) == (False, buyer.id)
+
+
+def test_redeem_unknown_code(buyer):
+    assert Ticket.redeem("unknown", user_id=buyer.id) is None
+    assert User.get_row(id=buyer.id).points == 100
+
+
+def test_redeem_for_unknown_user_keeps_the_ticket(db):
+    (code,) = Ticket.mint(1)
+
+    # Начисление points не находит пользователя, и погашение тикета откатывается вместе с ним.
+    with pytest.raises(NoResultFound):
+        Ticket.redeem(code, user_id=404)
+
+    assert Ticket.is_valid(code)
+